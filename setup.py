@@ -22,7 +22,7 @@ except ImportError:
 
 
 setup(name='ocstyle',
-      version='0.1.1',
+      version='0.1.1', # Keep in sync with ocstyle.__version__.
       description='Objective-C style checker',
       author='Cue Technologies, Inc.',
       url='https://www.github.com/Cue/ocstyle',
@@ -33,9 +33,13 @@ setup(name='ocstyle',
       install_requires=[
         'parcon==0.1.25'
       ],
+      extras_require={
+        'scandir': ['scandir']
+      },
       entry_points={
         'console_scripts': [
-          'ocstyle = ocstyle.main:main'
+          'ocstyle = ocstyle.main:main',
+          'ocstyle-client = ocstyle.client:main'
         ]
       },
 )
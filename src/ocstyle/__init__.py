@@ -13,3 +13,5 @@
 # limitations under the License.
 
 """Package for ocstyle"""
+
+__version__ = '0.1.1'
@@ -0,0 +1,73 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fixes errors by making the edits that the rules attach to them.
+
+All the edits for a file are made in one pass over its content, so they must not overlap.  An edit that overlaps one
+before it is left for the next run, and its error is reported as usual.
+"""
+
+import os
+import stat
+import tempfile
+
+from ocstyle.error import Error
+
+
+def edits(parts):
+  """The sorted (start, end, replacement) edits fixing the given errors, without any that overlap an earlier one."""
+  result = []
+  for edit in sorted(set(part.edit for part in parts if isinstance(part, Error) and part.edit)):
+    if not result or edit[0] >= result[-1][1]:
+      result.append(edit)
+  return result
+
+
+def apply(content, sortedEdits):
+  """The content with the given sorted, non-overlapping edits made."""
+  pieces = []
+  position = 0
+  for start, end, replacement in sortedEdits:
+    pieces.append(content[position:start])
+    pieces.append(replacement)
+    position = end
+  pieces.append(content[position:])
+  return ''.join(pieces)
+
+
+def write(path, content):
+  """Replaces the file at path, or the file a symlink there points to, with the content in one step, keeping its
+  permissions."""
+  path = os.path.realpath(path)
+  mode = stat.S_IMODE(os.stat(path).st_mode)
+  fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.ocstyle-fix')
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(content)
+    os.chmod(tempPath, mode)
+    os.rename(tempPath, path)
+  except:
+    os.remove(tempPath)
+    raise
+
+
+def fixFile(path, content, parts):
+  """Rewrites the file at path, which had the given content, with the fixes for the errors checking it found.  Returns
+  the fixed content, or None if there was nothing to fix."""
+  sortedEdits = edits(parts)
+  if not sortedEdits:
+    return None
+  fixed = apply(content, sortedEdits)
+  write(path, fixed)
+  return fixed
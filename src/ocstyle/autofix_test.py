@@ -0,0 +1,83 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for fixing errors."""
+
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+from ocstyle import autofix, main
+from ocstyle.error import Error
+
+
+
+class AutofixTest(unittest.TestCase):
+  """Tests for fixing errors."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def testEdits(self):
+    """Edits are sorted and made in one pass, leaving out duplicates and any that overlap an earlier one."""
+    parts = [Error('A', '', 5, None, (4, 6, ' ')), Error('B', '', 1, None, (1, 1, ';')), 'unparsed',
+             Error('C', '', 5, None, (5, 5, 'x')), Error('D', '', 1, None, (1, 1, ';')), Error('E', '', 8, None)]
+    edits = autofix.edits(parts)
+    self.assertEquals([(1, 1, ';'), (4, 6, ' ')], edits)
+    self.assertEquals('a;bcd efgh', autofix.apply('abcdefgh', [(1, 1, ';'), (4, 4, ' ')]))
+    self.assertEquals('a;bcd gh', autofix.apply('abcdefgh', edits))
+
+
+  def testFixFile(self):
+    """Fixed errors are not reported, and the rest are reported where they are in the fixed file."""
+    path = os.path.join(self.directory, 'a.m')
+    with open(path, 'w') as f:
+      f.write('- (void)a  {\n    int  x = 1;\n}\n\n@interface b\n@end\n')
+    os.chmod(path, 0600)
+    self.assertEquals(['6:13 [43] - BadClassName - Class names must be capitalized'],
+                      [str(part) for part in main.check(path, main.Options(fix=True))])
+    with open(path) as f:
+      self.assertEquals('- (void)a;\n{\n    int x = 1;\n}\n\n@interface b\n@end\n', f.read())
+    self.assertEquals(0600, os.stat(path).st_mode & 0777)
+    self.assertEquals([str(part) for part in main.check(path)],
+                      [str(part) for part in main.check(path, main.Options(fix=True))])
+
+
+  def testUnparsedTextAroundFix(self):
+    """Unparsed text on both sides of a fixed error is reported as checking the fixed file again reports it."""
+    path = os.path.join(self.directory, 'a.h')
+    with open(path, 'w') as f:
+      f.write('%%\n@class  A;\n%%\n')
+    fixed = [str(part) for part in main.check(path, main.Options(fix=True))]
+    self.assertEquals(['%%%%'], fixed)
+    self.assertEquals([str(part) for part in main.check(path)], fixed)
+
+
+  def testRun(self):
+    """--fix rewrites the files and reports what is left."""
+    path = os.path.join(self.directory, 'a.h')
+    with open(path, 'w') as f:
+      f.write('@class  A;\n')
+    out = StringIO.StringIO()
+    main.run(['--fix', path], out, StringIO.StringIO(), StringIO.StringIO())
+    self.assertEquals('%s\n\n' % path, out.getvalue())
+    with open(path) as f:
+      self.assertEquals('@class A;\n', f.read())
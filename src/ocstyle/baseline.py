@@ -0,0 +1,107 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Baselines of known errors, so that only new errors are reported.
+
+The fingerprint of an error is a 64 bit hash of its path, kind, message, and the text of its line without surrounding
+whitespace, so it survives lines being added or removed above it.  Errors with the same details in a file are numbered
+in order as well, so a copy of a known error is still new.  A baseline file is MAGIC followed by the sorted
+fingerprints, which are searched in place through mmap, so that a baseline of millions of errors opens at once.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+
+from ocstyle.error import Error
+
+
+MAGIC = 'ocstyle\x01'
+
+SIZE = 8
+
+
+
+class Baseline(object):
+  """A baseline file opened for matching."""
+
+  def __init__(self, path):
+    self.path = path
+    with open(path, 'rb') as f:
+      self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if self.data[:len(MAGIC)] != MAGIC or (len(self.data) - len(MAGIC)) % SIZE:
+      raise ValueError('%s is not an ocstyle baseline' % path)
+
+
+  def __getstate__(self):
+    return self.path
+
+
+  def __setstate__(self, path):
+    self.__init__(path)
+
+
+  def __len__(self):
+    return (len(self.data) - len(MAGIC)) / SIZE
+
+
+  def __contains__(self, fingerprint):
+    data = self.data
+    low = 0
+    high = len(self)
+    while low < high:
+      middle = (low + high) / 2
+      start = len(MAGIC) + middle * SIZE
+      if data[start:start + SIZE] < fingerprint:
+        low = middle + 1
+      else:
+        high = middle
+    start = len(MAGIC) + low * SIZE
+    return data[start:start + SIZE] == fingerprint
+
+
+  def filter(self, path, parts):
+    """Yields the errors and unparsed text checking the given path found that are not in the baseline."""
+    for fingerprint, part in fingerprints(path, parts):
+      if fingerprint not in self:
+        yield part
+
+
+def fingerprints(path, parts):
+  """Yields (fingerprint, part) for each of the errors and unparsed text checking the given path found, in order."""
+  path = os.path.normpath(path)
+  counts = {}
+  for part in parts:
+    if isinstance(part, Error):
+      details = '\0'.join((path, part.kind, part.message, part.lines.lineText(part.position).strip()))
+    else:
+      details = '\0'.join((path, 'Unparsed', part.text()))
+    count = counts.get(details, 0)
+    counts[details] = count + 1
+    yield hashlib.sha1('%s\0%d' % (details, count)).digest()[:SIZE], part
+
+
+def write(path, allFingerprints):
+  """Writes a baseline of the given fingerprints, replacing any file at the path in one step."""
+  fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.ocstyle-baseline')
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(MAGIC)
+      f.write(''.join(sorted(set(allFingerprints))))
+    os.chmod(tempPath, 0644)
+    os.rename(tempPath, path)
+  except:
+    os.remove(tempPath)
+    raise
@@ -0,0 +1,93 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for baselines of known errors."""
+
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+from ocstyle import baseline, main
+
+
+
+class BaselineTest(unittest.TestCase):
+  """Tests for baselines of known errors."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'baseline')
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def check(self, content, knownErrors=None):
+    """The errors found in the content as a.m."""
+    return main.checkFile('a.m', StringIO.StringIO(content), main.Options(baseline=knownErrors))
+
+
+  def testFingerprints(self):
+    """Fingerprints stay the same when lines move, but not for a repeated error or another file."""
+    content = '@interface a\n@end\n'
+    fingerprints = [fingerprint for fingerprint, _ in baseline.fingerprints('a.m', self.check(content))]
+    moved = [fingerprint for fingerprint, _ in baseline.fingerprints('./a.m', self.check('\n\n  ' + content))]
+    self.assertEquals(1, len(fingerprints))
+    self.assertEquals(fingerprints, moved)
+    repeated = [fingerprint for fingerprint, _ in baseline.fingerprints('a.m', self.check(content * 2))]
+    self.assertEquals(fingerprints[0], repeated[0])
+    self.assertNotEquals(repeated[0], repeated[1])
+    self.assertNotEquals(fingerprints, [fingerprint for fingerprint, _ in
+                                        baseline.fingerprints('b.m', self.check(content))])
+
+
+  def testBaseline(self):
+    """Only errors not in the baseline are reported."""
+    known = '@interface a\n@end\n\n@interface b\n@end\n'
+    fingerprints = [fingerprint for fingerprint, _ in baseline.fingerprints('a.m', self.check(known))]
+    baseline.write(self.path, fingerprints + fingerprints[:1])
+    knownErrors = baseline.Baseline(self.path)
+    self.assertEquals(2, len(knownErrors))
+    for fingerprint in fingerprints:
+      self.assertTrue(fingerprint in knownErrors)
+    self.assertFalse('\0' * baseline.SIZE in knownErrors)
+    self.assertFalse('\xff' * baseline.SIZE in knownErrors)
+
+    self.assertEquals([], self.check('\n' + known, knownErrors))
+    self.assertEquals(['BadClassName'], [err.kind for err in self.check('@interface c\n@end\n' + known, knownErrors)])
+    self.assertEquals(['BadClassName'] * 2, [err.kind for err in main.iterCheckFile(
+        'a.m', StringIO.StringIO(known + known), main.Options(baseline=knownErrors))])
+
+
+  def testCommandLine(self):
+    """A baseline written from the command line hides the errors it was written from."""
+    source = os.path.join(self.directory, 'a.m')
+    with open(source, 'w') as f:
+      f.write('@interface a\n@end\n')
+    out = StringIO.StringIO()
+    self.assertEquals(0, main.run(['--write-baseline', self.path, source], out, None, None))
+    self.assertEquals('', out.getvalue())
+    self.assertEquals(0, main.run(['--baseline', self.path, '--quiet-exit', source], out, None, None))
+    main.run(['--baseline', self.path, source], out, None, None)
+    self.assertEquals(source + '\n\n', out.getvalue())
+
+
+  def testNotBaseline(self):
+    """Files that are not baselines are rejected."""
+    with open(self.path, 'w') as f:
+      f.write('not a baseline')
+    self.assertRaises(ValueError, baseline.Baseline, self.path)
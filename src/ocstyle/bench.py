@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks for the Objective C style checker.
+
+Generates a deterministic corpus of Objective C and Objective C++ files and reports timings as JSON, for example:
+
+  python -m ocstyle.bench --files 200 --methods 20 --depth 4 > before.json
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import resource
+import StringIO
+import subprocess
+import sys
+import time
+
+import parcon
+
+import ocstyle
+from ocstyle import lexer, parsing
+from ocstyle.main import Options, checkFile
+
+
+TYPES = ('NSString *', 'NSArray *', 'NSDictionary *', 'NSInteger', 'BOOL', 'id', 'CGFloat', 'unsigned long long')
+
+WORDS = ('name', 'count', 'value', 'item', 'result', 'index', 'delegate', 'manager', 'request', 'data', 'view', 'title')
+
+
+
+class CorpusGenerator(object):
+  """Generates Objective C source files from a seeded random number generator.
+
+  Every construct is also recorded, with the name of the rule that parses it, in snippets.
+  """
+
+  def __init__(self, seed=0, methods=10, depth=3, errorRate=0.05):
+    self.random = random.Random(seed)
+    self.methods = methods
+    self.depth = depth
+    self.errorRate = errorRate
+    self.snippets = collections.defaultdict(list)
+
+
+  def _snippet(self, ruleName, text):
+    """Record a snippet parsed by the given rule."""
+    self.snippets[ruleName].append(text)
+    return text
+
+
+  def _word(self, capitalize=False):
+    """A random identifier part."""
+    word = self.random.choice(WORDS)
+    return word.capitalize() if capitalize else word
+
+
+  def _space(self):
+    """A single space, or sometimes a style error instead."""
+    return self.random.choice(('', '  ')) if self.random.random() < self.errorRate else ' '
+
+
+  def _declaration(self, name):
+    """A variable of a random type with the given name."""
+    typeName = self.random.choice(TYPES)
+    return typeName + name if typeName.endswith('*') else '%s %s' % (typeName, name)
+
+
+  def _selector(self):
+    """A random selector with parameters."""
+    parts = []
+    for i in range(self.random.randint(1, 3)):
+      name = self._word() + (self._word(True) if i == 0 else '')
+      parts.append('%s:(%s)%s' % (name, self.random.choice(TYPES), self._word()))
+    return ' '.join(parts)
+
+
+  def _methodSignature(self):
+    """A random method signature."""
+    return '%s%s(%s)%s' % (self.random.choice('-+'), self._space(), self.random.choice(TYPES), self._selector())
+
+
+  def _statements(self, indent, depth):
+    """Random statements with blocks nested to the given depth."""
+    pad = ' ' * indent
+    lines = ['%sNSInteger %s = %d;' % (pad, self._word(), self.random.randint(0, 99))]
+    lines.append('%s[self %s:@"%s" %s:%s];' % (pad, self._word(), self._word(), self._word(), self._word()))
+    if depth > 0:
+      keyword = self.random.choice(('if', 'while', 'for'))
+      condition = 'int i = 0; i < count; i++' if keyword == 'for' else '%s > (%s + 1)' % (self._word(), self._word())
+      lines.append('%s%s%s(%s) {' % (pad, keyword, self._space(), condition))
+      lines.extend(self._statements(indent + 4, depth - 1))
+      lines.append(pad + '}')
+    lines.append('%sreturn %s;' % (pad, self._word()))
+    return lines
+
+
+  def _method(self):
+    """A random method implementation."""
+    body = '\n'.join(['{'] + self._statements(4, self.random.randint(0, self.depth)) + ['}'])
+    self._snippet('codeBlock', body)
+    return self._snippet('method', '%s;\n%s' % (self._methodSignature(), body))
+
+
+  def _doc(self):
+    """A doc comment, or sometimes a missing doc comment."""
+    return '' if self.random.random() < self.errorRate else '/**\n * Documentation.\n */\n'
+
+
+  def _interface(self, className):
+    """A random interface declaration."""
+    lines = ['%s@interface %s : NSObject <NSCopying> {' % (self._doc(), className), '@private']
+    for _ in range(self.random.randint(1, 5)):
+      lines.append('    %s;' % self._declaration('_' + self._word() + self._word(True)))
+    lines.extend(['}', ''])
+    for _ in range(self.random.randint(1, 4)):
+      lines.append('%s@property (nonatomic, copy) %s;' % (self._doc(), self._declaration(self._word())))
+    lines.append('')
+    for _ in range(self.methods):
+      lines.extend([self._snippet('methodDeclaration', self._methodSignature() + ';'), ''])
+    lines.append('@end')
+    return self._snippet('interface', '\n'.join(lines))
+
+
+  def _protocol(self, className):
+    """A random protocol declaration."""
+    lines = ['%s@protocol %sDelegate <NSObject>' % (self._doc(), className), '']
+    for _ in range(self.random.randint(1, 3)):
+      lines.extend([self._methodSignature() + ';', ''])
+    lines.append('@end')
+    return self._snippet('protocolDeclaration', '\n'.join(lines))
+
+
+  def _implementation(self, className):
+    """A random implementation."""
+    lines = ['@implementation %s' % className, '']
+    for _ in range(self.methods):
+      lines.extend([self._method(), ''])
+    lines.append('@end')
+    return self._snippet('implementation', '\n'.join(lines))
+
+
+  def _cppCode(self):
+    """Random C++ code, much of which ocstyle does not parse."""
+    function = '\n'.join(['static int %s(int %s, int %s) {' % (self._word(), self._word(), self._word())] +
+                         self._statements(4, self.depth) + ['}'])
+    lines = ['namespace %s {' % self._word(), '',
+             'template <typename T> struct Box { T %s; };' % self._word(), '',
+             function, '', '}']
+    return self._snippet('namespace', '\n'.join(lines))
+
+
+  def header(self, index):
+    """A random header file."""
+    className = 'Class%d' % index
+    return className + '.h', '\n\n'.join([
+        '//\n//  %s.h\n//' % className, '#import <Foundation/Foundation.h>', '@class Forward%d;' % index,
+        self._protocol(className), self._interface(className)]) + '\n'
+
+
+  def implementation(self, index):
+    """A random implementation file."""
+    className = 'Class%d' % index
+    return className + '.m', '\n\n'.join([
+        '#import "%s.h"' % className, self._implementation(className)]) + '\n'
+
+
+  def objectiveCpp(self, index):
+    """A random Objective C++ file."""
+    className = 'Class%dCpp' % index
+    return className + '.mm', '\n\n'.join([
+        '#import "%s.h"' % className, '#include <vector>', self._cppCode(), self._implementation(className)]) + '\n'
+
+
+  def nested(self, depth):
+    """An implementation file with blocks, and an expression in parentheses, nested to the given depth."""
+    lines = ['#import "Nested.h"', '', '@implementation Nested', '', '- (void)nested;', '{']
+    for level in range(depth):
+      pad = ' ' * (4 * level + 4)
+      lines.append('%sif (%s > %d) {' % (pad, self._word(), level))
+    word = self._word()
+    lines.append('%sreturn %s%s%s;' % (' ' * (4 * depth + 4), '(' * depth, word, ')' * depth))
+    lines.extend(' ' * (4 * level + 4) + '}' for level in reversed(range(depth)))
+    lines.extend(['}', '', '@end'])
+    return 'Nested.m', '\n'.join(lines) + '\n'
+
+
+  def unbalanced(self, depth):
+    """An implementation file with blocks opened to the given depth and never closed, as in a file being edited."""
+    lines = ['#import "Unbalanced.h"', '', '@implementation Unbalanced', '', '- (void)unbalanced;', '{']
+    lines.extend('if (%s > %d) {' % (self._word(), level) for level in range(depth))
+    lines.append('return %s;' % self._word())
+    return 'Unbalanced.m', '\n'.join(lines) + '\n'
+
+
+  def corpus(self, files):
+    """A list of (name, content) pairs for the given number of files."""
+    makers = (self.header, self.implementation, self.objectiveCpp)
+    return [makers[i % len(makers)](i) for i in range(files)]
+
+
+
+def timed(function, repeat):
+  """The best time in seconds of calling function the given number of times."""
+  best = None
+  for _ in range(repeat):
+    start = time.time()
+    function()
+    elapsed = time.time() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+
+def throughput(seconds, byteCount, fileCount):
+  """Timing report for processing the given number of bytes and files."""
+  seconds = max(seconds, 1e-9)
+  return {
+    'seconds': round(seconds, 6),
+    'bytesPerSecond': int(byteCount / seconds),
+    'filesPerSecond': round(fileCount / seconds, 2)
+  }
+
+
+NESTING_DEPTHS = (500, 1000, 2000)
+
+
+STARTUP_COMMANDS = (
+  ('python', ['-c', 'pass']),
+  ('importMain', ['-c', 'import ocstyle.main']),
+  ('importRules', ['-c', 'import ocstyle.rules']),
+  ('noObjectiveC', ['-m', 'ocstyle.main', 'README.md', 'setup.py']),
+)
+
+
+def startup(repeat=3):
+  """Best times in seconds for fresh interpreters to import ocstyle and to check no Objective C files."""
+  environment = dict(os.environ)
+  packageRoot = os.path.dirname(os.path.dirname(os.path.abspath(ocstyle.__file__)))
+  environment['PYTHONPATH'] = os.pathsep.join(filter(None, [packageRoot, environment.get('PYTHONPATH')]))
+  return dict((name, round(timed(lambda args=args: subprocess.check_call([sys.executable] + args, env=environment),
+                                 repeat), 6))
+              for name, args in STARTUP_COMMANDS)
+
+
+def benchmark(generator, files, repeat=3, maxLineLength=120):
+  """Benchmarks checking a generated corpus, and returns the results as a dictionary."""
+  corpus = generator.corpus(files)
+  options = Options(maxLineLength)
+  byteCount = sum(len(content) for _, content in corpus)
+
+  def checkCorpus():
+    """Check every file."""
+    for name, content in corpus:
+      checkFile(name, StringIO.StringIO(content), options)
+
+  def checkLines():
+    """Index and check the lines of every file."""
+    for _, content in corpus:
+      parsing.CheckContext(content, maxLineLength).lineErrors()
+
+  def lexCorpus():
+    """Tokenize every file."""
+    for _, content in corpus:
+      lexer.Tokens(content)
+
+  timings = {
+    'checkFile': throughput(timed(checkCorpus, repeat), byteCount, len(corpus)),
+    'lines': throughput(timed(checkLines, repeat), byteCount, len(corpus)),
+    'lexer': throughput(timed(lexCorpus, repeat), byteCount, len(corpus)),
+  }
+
+  ruleTimings = {}
+  grammar = parsing.grammar(True)
+  for ruleName, snippets in sorted(generator.snippets.items()):
+    parser = parcon.Exact(getattr(grammar, ruleName), parsing.NO_SPACE)
+
+    def parseSnippets(parser=parser, snippets=snippets):
+      """Parse every snippet with the rule."""
+      for snippet in snippets:
+        with parsing.CheckContext(snippet, maxLineLength):
+          parser.parse_string(snippet)
+
+    ruleTimings[ruleName] = throughput(timed(parseSnippets, repeat), sum(len(s) for s in snippets), len(snippets))
+    ruleTimings[ruleName]['count'] = len(snippets)
+  timings['rules'] = ruleTimings
+
+  for key, maker in (('nesting', generator.nested), ('unbalanced', generator.unbalanced)):
+    nestingTimings = {}
+    for depth in NESTING_DEPTHS:
+      name, content = maker(depth)
+      nestingTimings[str(depth)] = throughput(
+          timed(lambda name=name, content=content: checkFile(name, StringIO.StringIO(content), options), repeat),
+          len(content), 1)
+    timings[key] = nestingTimings
+  timings['startup'] = startup(repeat)
+
+  return {
+    'version': ocstyle.__version__,
+    'python': sys.version.split()[0],
+    'corpus': {
+      'files': len(corpus),
+      'bytes': byteCount,
+      'lines': sum(content.count('\n') for _, content in corpus),
+    },
+    'timings': timings,
+    'peakMemoryKB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+  }
+
+
+def writeCorpus(generator, files, directory):
+  """Write a generated corpus to disk, for benchmarking the command line."""
+  if not os.path.isdir(directory):
+    os.makedirs(directory)
+  for name, content in generator.corpus(files):
+    with open(os.path.join(directory, name), 'w') as f:
+      f.write(content)
+
+
+def main():
+  """Run the benchmarks."""
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--seed', type=int, default=0, help='Seed for the generated corpus')
+  parser.add_argument('--files', type=int, default=30, help='Number of files to generate')
+  parser.add_argument('--methods', type=int, default=10, help='Methods per class')
+  parser.add_argument('--depth', type=int, default=3, help='Maximum nesting depth of blocks in methods')
+  parser.add_argument('--error-rate', dest='errorRate', type=float, default=0.05, help='Chance of each style error')
+  parser.add_argument('--repeat', type=int, default=3, help='Times to repeat each timing, keeping the best')
+  parser.add_argument('--write-corpus', dest='writeCorpus', metavar='DIR', help='Write the corpus here and exit')
+  args = parser.parse_args()
+
+  generator = CorpusGenerator(args.seed, args.methods, args.depth, args.errorRate)
+  if args.writeCorpus:
+    writeCorpus(generator, args.files, args.writeCorpus)
+    return
+
+  result = benchmark(generator, args.files, args.repeat)
+  result['options'] = {
+    'seed': args.seed,
+    'files': args.files,
+    'methods': args.methods,
+    'depth': args.depth,
+    'errorRate': args.errorRate,
+  }
+  json.dump(result, sys.stdout, indent=2, separators=(',', ': '), sort_keys=True)
+  sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,52 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the benchmarks."""
+
+import StringIO
+import unittest
+
+from ocstyle import bench
+from ocstyle.error import Error
+from ocstyle.main import checkFile
+
+
+
+class CorpusGeneratorTest(unittest.TestCase):
+  """Tests for the generated benchmark corpus."""
+
+  def testDeterministic(self):
+    """The same seed generates the same corpus."""
+    self.assertEquals(bench.CorpusGenerator(5).corpus(6), bench.CorpusGenerator(5).corpus(6))
+    self.assertNotEquals(bench.CorpusGenerator(5).corpus(6), bench.CorpusGenerator(6).corpus(6))
+
+
+  def testObjectiveCParses(self):
+    """The generated Objective C files parse completely, so the benchmarks exercise the grammar."""
+    for name, content in bench.CorpusGenerator(errorRate=0.5).corpus(2):
+      for part in checkFile(name, StringIO.StringIO(content)):
+        self.assertTrue(isinstance(part, Error), 'Failed to parse %r in %s' % (part, name))
+
+
+  def testDeepNestingParses(self):
+    """Blocks and parentheses nested far deeper than the recursion limit parse completely."""
+    name, content = bench.CorpusGenerator().nested(500)
+    for part in checkFile(name, StringIO.StringIO(content)):
+      self.assertTrue(isinstance(part, Error), 'Failed to parse %r' % part)
+
+
+  def testUnbalancedNestingParses(self):
+    """Blocks opened deeper than the recursion limit and never closed still check."""
+    name, content = bench.CorpusGenerator().unbalanced(100)
+    self.assertTrue(checkFile(name, StringIO.StringIO(content)))
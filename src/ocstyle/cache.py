@@ -0,0 +1,148 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On disk cache of style check results."""
+
+import errno
+import hashlib
+import marshal
+import os
+import tempfile
+import zlib
+
+import ocstyle
+from ocstyle.error import Error, Span
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# The modules whose source decides the errors and unparsed text that checking a file gives.
+RESULT_MODULES = ('error', 'handlers', 'lexer', 'lines', 'parsing', 'rules', 'suppression')
+
+_FINGERPRINT = []
+
+
+def defaultDirectory():
+  """The directory results are cached in when none is given."""
+  base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+  return os.path.join(base, 'ocstyle')
+
+
+def _source(name):
+  """The source code of the ocstyle module with the given name, read directly so that it need not be imported."""
+  with open(os.path.join(os.path.dirname(os.path.abspath(ocstyle.__file__)), name + '.py')) as f:
+    return f.read()
+
+
+def grammarFingerprint():
+  """Hash of the source of the grammar and of the modules making results, so that changing them invalidates the
+  cache."""
+  if not _FINGERPRINT:
+    digest = hashlib.sha1()
+    for name in RESULT_MODULES:
+      digest.update(_source(name))
+    _FINGERPRINT.append(digest.hexdigest())
+  return _FINGERPRINT[0]
+
+
+def serialize(result):
+  """Serialize a list of errors and unparsed spans, keeping only the ranges of each span."""
+  return zlib.compress(marshal.dumps([(part.kind, part.message, part.position, part.edit) if isinstance(part, Error)
+                                      else list(part.ranges) for part in result]))
+
+
+def deserialize(data, lines):
+  """Rebuild a list of errors and unparsed spans, pointing at the given line data."""
+  return [Error(part[0], part[1], part[2], lines, part[3]) if isinstance(part, tuple)
+          else Span(lines.content, tuple(part), lines) for part in marshal.loads(zlib.decompress(data))]
+
+
+
+class ResultCache(object):
+  """Size bounded cache of check results, evicting the least recently used entries.
+
+  Worker processes store results in copies of the cache, so none of them knows its size.  Results are only stored by
+  put, and the process that made the cache trims it once the files are checked.
+  """
+
+  def __init__(self, directory=None, maxBytes=DEFAULT_MAX_BYTES):
+    self.directory = directory or defaultDirectory()
+    self.maxBytes = maxBytes
+
+
+  def key(self, content, maxLineLength, implementation):
+    """Key for the results of checking the given content with the given options."""
+    digest = hashlib.sha1('%s\0%s\0%d\0%d\0' % (
+        ocstyle.__version__, grammarFingerprint(), maxLineLength, implementation))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+  def get(self, key, lines):
+    """Returns the cached result for the key, or None."""
+    path = os.path.join(self.directory, key)
+    try:
+      with open(path, 'rb') as f:
+        data = f.read()
+      os.utime(path, None) # The modification time is the recency used for eviction.
+      return deserialize(data, lines)
+    except (IOError, OSError, EOFError, ValueError, TypeError, zlib.error):
+      return None
+
+
+  def put(self, key, result):
+    """Stores a result in the cache."""
+    data = serialize(result)
+    try:
+      if not os.path.isdir(self.directory):
+        os.makedirs(self.directory)
+      fd, tempPath = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+      os.rename(tempPath, os.path.join(self.directory, key))
+    except (IOError, OSError):
+      pass
+
+
+  def trim(self):
+    """Removes least recently used entries until the cache is comfortably under its size limit, if it is over it."""
+    try:
+      entries = sorted(self._entries())
+    except OSError: # Nothing has been cached.
+      return
+    size = sum(entrySize for _, entrySize, _ in entries)
+    if size <= self.maxBytes:
+      return
+    target = self.maxBytes * 0.9
+    for _, entrySize, path in entries:
+      if size <= target:
+        break
+      try:
+        os.remove(path)
+      except OSError as e:
+        if e.errno != errno.ENOENT:
+          raise
+      size -= entrySize
+
+
+  def _entries(self):
+    """Yields (mtime, size, path) for every entry."""
+    for name in os.listdir(self.directory):
+      if not name.startswith('.'):
+        path = os.path.join(self.directory, name)
+        try:
+          stat = os.stat(path)
+        except OSError:
+          continue
+        yield stat.st_mtime, stat.st_size, path
@@ -0,0 +1,100 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the result cache."""
+
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+from ocstyle import cache, main, parsing
+
+
+
+class ResultCacheTest(unittest.TestCase):
+  """Tests for the result cache."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def testKeyDependsOnOptions(self):
+    """Different content or options get different keys."""
+    resultCache = cache.ResultCache(self.directory)
+    key = resultCache.key('@end\n', 120, False)
+    self.assertEquals(key, resultCache.key('@end\n', 120, False))
+    self.assertNotEquals(key, resultCache.key('@end \n', 120, False))
+    self.assertNotEquals(key, resultCache.key('@end\n', 100, False))
+    self.assertNotEquals(key, resultCache.key('@end\n', 120, True))
+
+
+  def testCachedResultMatches(self):
+    """A cached result reports the same errors as a fresh check."""
+    content = '#import"Test.h"\n@class  A;\n\nx = 1;\n'
+    options = main.Options(resultCache=cache.ResultCache(self.directory))
+    fresh = [str(part) for part in main.checkFile('Test.h', StringIO.StringIO(content), options)]
+    self.assertEquals(1, len(os.listdir(self.directory)))
+    cached = [str(part) for part in main.checkFile('Test.h', StringIO.StringIO(content), options)]
+    self.assertEquals(fresh, cached)
+    self.assertEquals(3, len(fresh))
+    self.assertEquals('x=1;', fresh[0])
+
+
+  def testCachedResultNeedsNoGrammar(self):
+    """A cached result is found without building the grammar."""
+    content = '@class  A;\n'
+    options = main.Options(resultCache=cache.ResultCache(self.directory))
+    fresh = [str(part) for part in main.checkFile('Test.h', StringIO.StringIO(content), options)]
+    grammar = parsing.grammar
+    parsing.grammar = None
+    try:
+      cached = [str(part) for part in main.checkFile('Test.h', StringIO.StringIO(content), options)]
+    finally:
+      parsing.grammar = grammar
+    self.assertEquals(fresh, cached)
+
+
+  def testEviction(self):
+    """Trimming the cache evicts the least recently used entries to bring it under its size limit."""
+    resultCache = cache.ResultCache(self.directory, 1000)
+    resultCache.trim()
+    for i in range(50):
+      resultCache.put('key%d' % i, [main.Error('Kind', 'Message %d' % i, i, None)])
+    self.assertEquals(50, len(os.listdir(self.directory)))
+    resultCache.trim()
+    names = os.listdir(self.directory)
+    self.assertTrue(0 < len(names) < 50)
+    self.assertTrue('key49' in names)
+    self.assertTrue(sum(os.path.getsize(os.path.join(self.directory, name)) for name in names) <= 1000)
+
+
+  def testRunTrims(self):
+    """A run with a cache trims it once its files are checked, including after checking them in parallel."""
+    paths = []
+    for i in range(8):
+      paths.append(os.path.join(self.directory, 'File%d.m' % i))
+      with open(paths[-1], 'w') as f:
+        f.write('@class  A%d;\n' % i)
+    cacheDirectory = os.path.join(self.directory, 'cache')
+    for jobs in ('1', '2'):
+      shutil.rmtree(cacheDirectory, True)
+      main.run(['--cache-dir', cacheDirectory, '--cache-size', '0', '--jobs', jobs] + paths, StringIO.StringIO(),
+               None, None)
+      self.assertEquals([], os.listdir(cacheDirectory))
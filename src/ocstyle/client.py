@@ -0,0 +1,194 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Client for the style checker daemon, which starts the daemon if it is not running.
+
+Takes the same arguments as ocstyle.  This module only imports the standard library and ocstyle.discovery, so that it
+starts quickly.
+
+Requests and responses are sent as frames of a channel byte, the length of the data as 8 hex digits, and the data.  A
+request is a REQUEST frame with the arguments and working directory as JSON, optionally followed by a STDIN frame.  The
+response is any number of STDOUT and STDERR frames followed by an EXIT frame with the exit status.
+"""
+
+import errno
+import json
+import os
+import socket
+import sys
+import time
+
+import ocstyle
+from ocstyle.discovery import EXTENSIONS
+
+
+REQUEST, STDIN, STDOUT, STDERR, EXIT = 'r', 'i', 'o', 'e', 'x'
+
+DEFAULT_IDLE_TIMEOUT = 600
+
+SPAWN_TIMEOUT = 10
+
+_NOT_RUNNING = (errno.ENOENT, errno.ECONNREFUSED)
+
+_OPTIONS_WITHOUT_FILES = ('-h', '--help', '--daemon', '--stdin-filename', '-r', '--recursive', '--watch')
+
+
+def needsCheck(args):
+  """Whether the given ocstyle arguments include an Objective C file, or an option that does not need one.
+
+  Checking nothing is the most common case for a commit hook, so ocstyle exits before loading the grammar when this is
+  False.
+  """
+  return any(arg.endswith(EXTENSIONS) or arg.partition('=')[0] in _OPTIONS_WITHOUT_FILES for arg in args)
+
+
+def defaultSocketPath():
+  """The socket the daemon for this version of ocstyle listens on, in a directory only this user can access."""
+  base = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+  return os.path.join(base, 'ocstyle-%d' % os.getuid(), 'daemon-%s.sock' % ocstyle.__version__)
+
+
+def secureDirectory(path):
+  """Creates the given directory for this user only, or checks that an existing one is not shared."""
+  try:
+    os.mkdir(path, 0700)
+  except OSError as e:
+    if e.errno != errno.EEXIST:
+      raise
+  info = os.stat(path)
+  if info.st_uid != os.getuid() or info.st_mode & 0077:
+    raise OSError(errno.EPERM, 'Daemon socket directory must only be accessible to its owner', path)
+
+
+def sendFrame(sock, channel, data):
+  """Sends a frame of data on the given channel."""
+  sock.sendall('%s%08x' % (channel, len(data)))
+  sock.sendall(data)
+
+
+def readFrames(sock):
+  """Yields (channel, data) for each frame received until the other end stops sending."""
+  f = sock.makefile('rb', 65536)
+  try:
+    while True:
+      header = f.read(9)
+      if len(header) < 9:
+        return
+      length = int(header[1:], 16)
+      data = f.read(length)
+      if len(data) < length:
+        return
+      yield header[0], data
+  finally:
+    f.close()
+
+
+def connect(socketPath):
+  """Connects to the daemon listening on the given socket."""
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.connect(socketPath)
+  except:
+    sock.close()
+    raise
+  return sock
+
+
+def startDaemon(socketPath):
+  """Starts a daemon listening on the given socket in the background."""
+  import subprocess # Only needed to start the daemon.
+  secureDirectory(os.path.dirname(socketPath))
+  with open(os.devnull, 'r+') as devnull:
+    subprocess.Popen([sys.executable, '-m', 'ocstyle.main', '--daemon', '--socket', socketPath],
+                     stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True, preexec_fn=os.setsid, cwd='/')
+
+
+def connectOrStart(socketPath):
+  """Connects to the daemon listening on the given socket, starting it if it is not running."""
+  try:
+    return connect(socketPath)
+  except socket.error as e:
+    if e.errno not in _NOT_RUNNING:
+      raise
+
+  startDaemon(socketPath)
+  deadline = time.time() + SPAWN_TIMEOUT
+  delay = 0.005
+  while True:
+    try:
+      return connect(socketPath)
+    except socket.error as e:
+      if e.errno not in _NOT_RUNNING or time.time() > deadline:
+        raise
+    time.sleep(delay)
+    delay = min(delay * 2, 0.1)
+
+
+def request(sock, args, cwd, stdin, out, err):
+  """Sends a check to the daemon and writes the output to out and err as it arrives.
+
+  Returns the exit status, or None if the daemon exited before finishing.
+  """
+  sendFrame(sock, REQUEST, json.dumps({'args': args, 'cwd': cwd}))
+  if stdin is not None:
+    sendFrame(sock, STDIN, stdin)
+  sock.shutdown(socket.SHUT_WR)
+  for channel, data in readFrames(sock):
+    if channel == STDOUT:
+      out.write(data)
+    elif channel == STDERR:
+      err.write(data)
+    elif channel == EXIT:
+      return int(data)
+
+
+def runLocally(args):
+  """Runs the check in this process, for when there is no daemon."""
+  from ocstyle import main
+  return main.run(args, sys.stdout, sys.stderr, sys.stdin)
+
+
+def main():
+  """Main body of the client script."""
+  args = sys.argv[1:]
+  socketPath = defaultSocketPath()
+  for i, arg in enumerate(args):
+    if arg == '--socket' and i + 1 < len(args):
+      socketPath = args[i + 1]
+    elif arg.startswith('--socket='):
+      socketPath = arg.partition('=')[2]
+  if not needsCheck(args):
+    sys.exit(0)
+  if '--daemon' in args or '--watch' in args: # Watching keeps its own process warm.
+    sys.exit(runLocally(args))
+
+  try:
+    sock = connectOrStart(socketPath)
+  except (socket.error, OSError) as e:
+    sys.stderr.write('ocstyle: checking without the daemon: %s\n' % e)
+    sys.exit(runLocally(args))
+
+  readsStdin = any(arg == '--stdin-filename' or arg.startswith('--stdin-filename=') for arg in args)
+  try:
+    status = request(sock, args, os.getcwd(), sys.stdin.read() if readsStdin else None, sys.stdout, sys.stderr)
+  finally:
+    sock.close()
+  if status is None:
+    sys.stderr.write('ocstyle: the daemon exited before finishing the check\n')
+    status = 1
+  sys.exit(status)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,153 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Daemon that keeps the grammar loaded between checks, for ocstyle-client."""
+
+import errno
+import json
+import os
+import socket
+import SocketServer
+import StringIO
+import sys
+import traceback
+
+from ocstyle import client, main, parsing
+
+
+BUFFER_SIZE = 64 * 1024
+
+
+
+class FrameWriter(object):
+  """A file like object that buffers what is written to it and sends it as frames on a channel."""
+
+  def __init__(self, sock, channel):
+    self.sock = sock
+    self.channel = channel
+    self.buffer = []
+    self.size = 0
+
+
+  def write(self, data):
+    """Writes data, sending it when the buffer is full."""
+    self.buffer.append(data)
+    self.size += len(data)
+    if self.size >= BUFFER_SIZE:
+      self.flush()
+
+
+  def flush(self):
+    """Sends any buffered data."""
+    if self.size:
+      client.sendFrame(self.sock, self.channel, ''.join(self.buffer))
+    self.buffer = []
+    self.size = 0
+
+
+
+class RequestHandler(SocketServer.BaseRequestHandler):
+  """Runs a check for the client, as if the client's arguments were passed to ocstyle in its working directory."""
+
+  def handle(self):
+    request = None
+    stdin = ''
+    for channel, data in client.readFrames(self.request):
+      if channel == client.REQUEST:
+        request = json.loads(data)
+      elif channel == client.STDIN:
+        stdin = data
+    if request is None:
+      return
+
+    out = FrameWriter(self.request, client.STDOUT)
+    err = FrameWriter(self.request, client.STDERR)
+    cwd = os.getcwd()
+    streams = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = out, err # For argparse.
+    try:
+      os.chdir(request['cwd'].encode('utf-8'))
+      args = [arg.encode('utf-8') for arg in request['args'] if arg != '--daemon']
+      status = main.run(args, out, err, StringIO.StringIO(stdin))
+    except SystemExit as e:
+      status = e.code or 0
+    except Exception: # Report it to the client, and keep serving. # pylint: disable=W0703
+      err.write(traceback.format_exc())
+      status = 1
+    finally:
+      sys.stdout, sys.stderr = streams
+      os.chdir(cwd)
+
+    try:
+      out.flush()
+      err.flush()
+      client.sendFrame(self.request, client.EXIT, str(status))
+    except socket.error: # The client went away.
+      pass
+
+
+
+class Daemon(SocketServer.UnixStreamServer):
+  """Serves checks one at a time on a Unix socket, until no check is requested for idleTimeout seconds.
+
+  Both variants of the grammar are built before the socket is listened on, so even the first check is fast, and worker
+  pools are forked from the daemon for each check, so they start warm as well.
+  """
+
+  def __init__(self, socketPath, idleTimeout=client.DEFAULT_IDLE_TIMEOUT):
+    client.secureDirectory(os.path.dirname(socketPath))
+    _removeStaleSocket(socketPath)
+    for header in (True, False):
+      parsing.grammar(header)
+    SocketServer.UnixStreamServer.__init__(self, socketPath, RequestHandler)
+    self.timeout = idleTimeout
+    self.idle = False
+    self.socketId = _fileId(socketPath)
+
+
+  def handle_timeout(self):
+    self.idle = True
+
+
+  def serve(self):
+    """Serves checks until idle."""
+    try:
+      while not self.idle:
+        self.handle_request()
+    finally:
+      self.server_close()
+      if _fileId(self.server_address) == self.socketId: # Another daemon may have replaced the socket.
+        os.unlink(self.server_address)
+
+
+def _fileId(path):
+  """Identifies the file at the given path, or None if there is none."""
+  try:
+    info = os.stat(path)
+  except OSError:
+    return None
+  return info.st_dev, info.st_ino
+
+
+def _removeStaleSocket(socketPath):
+  """Removes the socket left by a daemon that did not shut down, failing if a daemon is still listening on it."""
+  try:
+    client.connect(socketPath).close()
+  except socket.error as e:
+    if e.errno == errno.ECONNREFUSED:
+      os.unlink(socketPath)
+    elif e.errno != errno.ENOENT:
+      raise
+  else:
+    raise socket.error(errno.EADDRINUSE, 'A daemon is already listening on %s' % socketPath)
@@ -0,0 +1,90 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the style checker daemon and its client."""
+
+import StringIO
+import os.path
+import pkg_resources
+import shutil
+import tempfile
+import threading
+import unittest
+
+from ocstyle import client, daemon, main, parsing
+
+
+
+class DaemonTest(unittest.TestCase):
+  """Tests for the style checker daemon and its client."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.socketPath = os.path.join(self.directory, 'run', 'daemon.sock')
+    self.daemon = daemon.Daemon(self.socketPath, 0.5)
+    self.thread = threading.Thread(target=self.daemon.serve)
+    self.thread.start()
+
+
+  def tearDown(self):
+    self.thread.join()
+    shutil.rmtree(self.directory)
+
+
+  def request(self, args, stdin=None):
+    """Sends a request to the daemon and returns the exit status and output."""
+    out = StringIO.StringIO()
+    err = StringIO.StringIO()
+    sock = client.connect(self.socketPath)
+    try:
+      status = client.request(sock, args, self.directory, stdin, out, err)
+    finally:
+      sock.close()
+    return status, out.getvalue(), err.getvalue()
+
+
+  def testRequests(self):
+    """The daemon reports the same as running locally, from the client's working directory, until it is idle."""
+    path = pkg_resources.resource_filename('ocstyle', os.path.join('testdata', 'Parsing.m'))
+    shutil.copy(path, self.directory)
+    expected = StringIO.StringIO()
+    main.run([path], expected, None, None)
+    self.assertEquals((0, expected.getvalue().replace(path, 'Parsing.m'), ''), self.request(['Parsing.m']))
+
+    with open(path) as f:
+      content = f.read()
+    status, out, _ = self.request(['--stdin-filename', 'Other.m', '--format', 'jsonl'], content)
+    self.assertEquals(0, status)
+    self.assertTrue(out.startswith('{"column": '))
+
+    status, out, err = self.request(['--format', 'bogus', 'Parsing.m'])
+    self.assertEquals((2, ''), (status, out))
+    self.assertTrue('invalid choice' in err)
+
+    self.thread.join()
+    self.assertFalse(os.path.exists(self.socketPath))
+
+
+  def testGrammarBuiltAtStartup(self):
+    """Both grammars are built before the daemon accepts a check, so the first check is not slow."""
+    self.thread.join()
+    grammars = dict(parsing._GRAMMARS) # pylint: disable=W0212
+    parsing._GRAMMARS.clear() # pylint: disable=W0212
+    other = daemon.Daemon(os.path.join(self.directory, 'run', 'other.sock'), 0)
+    try:
+      self.assertEquals([False, True], sorted(parsing._GRAMMARS)) # pylint: disable=W0212
+    finally:
+      other.server_close()
+      parsing._GRAMMARS.clear() # pylint: disable=W0212
+      parsing._GRAMMARS.update(grammars) # pylint: disable=W0212
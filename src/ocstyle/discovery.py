@@ -0,0 +1,188 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Finds the files to check in directory trees."""
+
+import fnmatch
+import os
+import re
+
+try:
+  from scandir import scandir
+except ImportError:
+  scandir = None
+
+
+EXTENSIONS = ('.h', '.m', '.mm')
+
+IGNORE_FILES = ('.gitignore', '.ocstyleignore')
+
+VERSION_CONTROL_DIRECTORIES = ('.git', '.hg', '.svn')
+
+
+
+class IgnoreFile(object):
+  """The patterns in a .gitignore style file, which apply to the directory containing it and everything below it."""
+
+  def __init__(self, lines):
+    self.rules = []
+    for line in lines:
+      line = line.rstrip('\r\n')
+      if not line.strip() or line.startswith('#'):
+        continue
+      line = line.rstrip(' ')
+      negated = line.startswith('!')
+      if negated:
+        line = line[1:]
+      directoryOnly = line.endswith('/')
+      line = line.rstrip('/')
+      if line:
+        self.rules.append((self._compile(line), '/' in line, directoryOnly, negated))
+
+
+  @staticmethod
+  def _compile(pattern):
+    """Compiles a pattern to a regex matching the paths it ignores."""
+    parts = []
+    for part in re.split(r'(\*\*/|/\*\*$|\*|\?|\[[^\]]*\])', pattern.lstrip('/')):
+      if part == '**/':
+        parts.append('(?:.*/)?')
+      elif part == '/**':
+        parts.append('/.*')
+      elif part == '*':
+        parts.append('[^/]*')
+      elif part == '?':
+        parts.append('[^/]')
+      elif part.startswith('[') and part.endswith(']') and len(part) > 2:
+        parts.append('[^' + part[2:] if part[1] == '!' else part)
+      else:
+        parts.append(re.escape(part))
+    return re.compile(''.join(parts) + '$')
+
+
+  @classmethod
+  def read(cls, path):
+    """Reads the ignore file at the given path, or returns None if there is none."""
+    try:
+      with open(path) as f:
+        return cls(f)
+    except IOError:
+      return None
+
+
+  def match(self, relativePath, isDirectory):
+    """Returns True if the last pattern matching the path ignores it, False if it re-includes it, or None."""
+    result = None
+    name = relativePath.rpartition('/')[2]
+    for regex, anchored, directoryOnly, negated in self.rules:
+      if directoryOnly and not isDirectory:
+        continue
+      if regex.match(relativePath if anchored else name):
+        result = not negated
+    return result
+
+
+
+class Excludes(object):
+  """Glob patterns for paths not to check."""
+
+  def __init__(self, globs):
+    self.regex = re.compile('|'.join(fnmatch.translate(glob) for glob in globs)) if globs else None
+
+
+  def match(self, *paths):
+    """Whether any of the given paths or names matches a glob."""
+    return self.regex is not None and any(self.regex.match(path) for path in paths)
+
+
+  def matchPathOrParts(self, path):
+    """Whether the path or any of the directories and name in it matches a glob."""
+    return self.match(path, *[part for part in path.split(os.sep) if part not in ('', '.', '..')])
+
+
+def _entries(directory):
+  """Yields (name, isDirectory, isFile) for each entry of the directory, without following symlinks to directories."""
+  if scandir is not None:
+    for entry in scandir(directory):
+      isDirectory = entry.is_dir(follow_symlinks=False)
+      yield entry.name, isDirectory, not isDirectory and entry.is_file()
+  else:
+    for name in os.listdir(directory):
+      path = os.path.join(directory, name)
+      isDirectory = os.path.isdir(path) and not os.path.islink(path)
+      yield name, isDirectory, not isDirectory and os.path.isfile(path)
+
+
+def walk(root, excludes=Excludes(()), extensions=EXTENSIONS, onDirectory=None):
+  """Yields the path of each file with one of the extensions under root as it is found, with the files in each
+  directory in sorted order, followed by those in its subdirectories.
+
+  Skips paths, paths relative to root, and names that match excludes, what the .gitignore and .ocstyleignore files in
+  root and the directories below it ignore, and version control directories.  Calls onDirectory, if given, with root
+  and each directory under it that is not skipped, before yielding the files in it.
+  """
+  stack = [(root, '', [])]
+  while stack:
+    directory, relativeDirectory, ignoreFiles = stack.pop()
+    if onDirectory:
+      onDirectory(directory)
+    ignoreFiles = ignoreFiles + [(relativeDirectory, ignoreFile) for ignoreFile in
+                                 (IgnoreFile.read(os.path.join(directory, name)) for name in IGNORE_FILES)
+                                 if ignoreFile]
+    try:
+      entries = sorted(_entries(directory))
+    except OSError:
+      continue
+
+    subdirectories = []
+    for name, isDirectory, isFile in entries:
+      if isDirectory and name in VERSION_CONTROL_DIRECTORIES or \
+         not isDirectory and not (isFile and name.endswith(extensions)):
+        continue
+      path = os.path.join(directory, name)
+      relativePath = relativeDirectory + name
+      if excludes.match(path, relativePath, name) or _ignored(ignoreFiles, relativePath, isDirectory):
+        continue
+      if isDirectory:
+        subdirectories.append((path, relativePath + '/', ignoreFiles))
+      else:
+        yield path
+    stack.extend(reversed(subdirectories))
+
+
+def _ignored(ignoreFiles, relativePath, isDirectory):
+  """Whether the given ignore files, outermost first, ignore the path relative to the root of the walk."""
+  for base, ignoreFile in reversed(ignoreFiles):
+    if relativePath.startswith(base):
+      result = ignoreFile.match(relativePath[len(base):], isDirectory)
+      if result is not None:
+        return result
+  return False
+
+
+def discover(paths, recursive=False, excludeGlobs=()):
+  """Yields the paths to check for the given command line paths, as they are found.
+
+  Files are checked whatever their extension, unless excluded.  With recursive set, directories are searched for files
+  to check; otherwise they are passed through.
+  """
+  excludes = Excludes(excludeGlobs)
+  for path in paths:
+    if excludes.matchPathOrParts(path):
+      continue
+    if recursive and os.path.isdir(path):
+      for found in walk(path, excludes):
+        yield found
+    else:
+      yield path
@@ -0,0 +1,87 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for finding the files to check."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ocstyle import discovery
+
+
+
+class DiscoveryTest(unittest.TestCase):
+  """Tests for finding the files to check."""
+
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    for path in ('src/a.m', 'src/b.h', 'src/sub/c.mm', 'src/sub/d.txt', 'Pods/X/p.m', 'build/b.m', '.git/g.m',
+                 'gen/keep.m', 'gen/drop.m', 'top.m'):
+      self.write(path, '')
+    self.write('.gitignore', '# Comment\nbuild/\n/gen/*.m\n!gen/keep.m\n')
+    self.write('src/.ocstyleignore', 'c.mm\n')
+
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+
+  def write(self, path, content):
+    """Writes a file in the test tree."""
+    path = os.path.join(self.root, path)
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+      f.write(content)
+
+
+  def discover(self, *excludeGlobs):
+    """The files found in the test tree, relative to it."""
+    return [os.path.relpath(path, self.root) for path in discovery.discover([self.root], True, excludeGlobs)]
+
+
+  def testDiscover(self):
+    """Files are found in order, skipping ignored and excluded paths."""
+    expected = ['top.m', 'Pods/X/p.m', 'gen/keep.m', 'src/a.m', 'src/b.h']
+    self.assertEquals(expected, self.discover())
+    self.assertEquals(expected[:1] + expected[2:], self.discover('Pods'))
+    self.assertEquals(['top.m', 'gen/keep.m'], self.discover('*/src/*', 'P*'))
+
+    scandir = discovery.scandir
+    discovery.scandir = None
+    try:
+      self.assertEquals(expected, self.discover())
+    finally:
+      discovery.scandir = scandir
+
+
+  def testExplicitPaths(self):
+    """Paths given explicitly are passed through unless excluded, whatever their extension."""
+    self.assertEquals(['a.txt', 'dir'], list(discovery.discover(['a.txt', 'Pods/b.m', 'dir'], False, ['Pods'])))
+
+
+  def testIgnoreFile(self):
+    """Ignore file patterns match like .gitignore patterns."""
+    ignoreFile = discovery.IgnoreFile(['*.m', '!keep.m', 'docs/**/*.h', 'out/', '[!a]b.h'])
+    self.assertTrue(ignoreFile.match('x/y.m', False))
+    self.assertFalse(ignoreFile.match('x/keep.m', False))
+    self.assertTrue(ignoreFile.match('docs/a/b/c.h', False))
+    self.assertTrue(ignoreFile.match('docs/c.h', False))
+    self.assertEquals(None, ignoreFile.match('src/docs/c.h', False))
+    self.assertTrue(ignoreFile.match('x/out', True))
+    self.assertEquals(None, ignoreFile.match('x/out', False))
+    self.assertTrue(ignoreFile.match('cb.h', False))
+    self.assertEquals(None, ignoreFile.match('ab.h', False))
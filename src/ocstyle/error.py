@@ -12,35 +12,100 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Objective C style error type."""
-
-import bisect
-
-
+"""Objective C style error and unparsed text types."""
 
 class Error(object):
-  """An error."""
+  """An error, with the (start, end, replacement) edit that fixes it if there is one."""
 
-  __slots__ = ('kind', 'position', 'message', 'lines')
+  __slots__ = ('kind', 'position', 'message', 'lines', 'edit')
 
 
-  def __init__(self, kind, message, position, lines):
+  def __init__(self, kind, message, position, lines, edit=None):
     self.kind = kind
     self.position = position
     self.message = message
     self.lines = lines
+    self.edit = edit
 
 
   def lineAndOffset(self):
     """Return the line and offset where this error occurred."""
-    line = bisect.bisect_left(self.lines, self.position)
-    return line, self.position - self.lines[line - 1]
+    return self.lines.lineAndOffset(self.position)
 
 
-  def __str__(self):
-    line, offset = self.lineAndOffset()
+  def lineAndColumn(self):
+    """Return the 1 based line and column, with tabs expanded, where this error occurred."""
+    return max(self.lines.lineAndOffset(self.position)[0], 1), self.lines.column(self.position)
+
+
+  def describe(self, line, offset):
+    """Describe this error, given the line and offset lineAndOffset returns."""
     return '%d:%d [%d] - %s - %s' % (line, offset, self.position, self.kind, self.message)
 
 
+  def __str__(self):
+    return self.describe(*self.lineAndOffset())
+
+
   def __repr__(self):
     return 'Error<%s>' % self
+
+
+
+class Span(object):
+  """Text that could not be parsed, as (start, end) ranges of the content.  The text is only copied out of the content
+  when it is needed.
+
+  Unparsed text found on both sides of parsed text that gives no error is reported together, so a span can have a
+  range for each side.
+  """
+
+  __slots__ = ('content', 'ranges', 'lines')
+
+
+  def __init__(self, content, ranges, lines):
+    self.content = content
+    self.ranges = ranges
+    self.lines = lines
+
+
+  @staticmethod
+  def join(spans):
+    """The given spans of the same content as one, with touching ranges merged."""
+    if len(spans) == 1:
+      return spans[0]
+    ranges = []
+    for span in spans:
+      for start, end in span.ranges:
+        if ranges and ranges[-1][1] == start:
+          ranges[-1] = (ranges[-1][0], end)
+        else:
+          ranges.append((start, end))
+    return Span(spans[0].content, tuple(ranges), spans[0].lines)
+
+
+  @property
+  def position(self):
+    """Where the text starts."""
+    return self.ranges[0][0]
+
+
+  def text(self):
+    """The unparsed text."""
+    if len(self.ranges) == 1:
+      start, end = self.ranges[0]
+      return self.content[start:end]
+    return ''.join([self.content[start:end] for start, end in self.ranges])
+
+
+  def lineAndColumn(self):
+    """Return the 1 based line and column, with tabs expanded, where the text starts."""
+    return max(self.lines.lineAndOffset(self.position)[0], 1), self.lines.column(self.position)
+
+
+  def __str__(self):
+    return self.text()
+
+
+  def __repr__(self):
+    return 'Span<%r>' % self.text()
@@ -0,0 +1,184 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Machine readable report formats.
+
+Each writer streams records to its output as they are written, so a report is never held in memory.  A record is
+either a (line, column, position, kind, message) tuple for an error, or a (line, column, position, text) tuple for text
+that could not be parsed.
+"""
+
+import json
+import re
+
+import ocstyle
+
+
+UNPARSED = 'Unparsed'
+
+XML_ATTRIBUTE_ESCAPES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'),
+                         ('\n', '&#10;'), ('\r', '&#13;'), ('\t', '&#9;'))
+
+# Characters XML 1.0 does not allow even escaped: most control characters, unpaired surrogates and two non-characters.
+XML_INVALID = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]|[\ud800-\udbff](?![\udc00-\udfff])|'
+                         u'(?<![\ud800-\udbff])[\udc00-\udfff]')
+
+
+def text(value):
+  """The given file path or content as unicode, whatever its encoding."""
+  return value if isinstance(value, unicode) else value.decode('utf-8', 'replace')
+
+
+def unparsedMessage(value):
+  """Message for a record of unparsed text."""
+  return 'Could not parse %r' % value
+
+
+def recordOrder(record):
+  """Sort key for the records of a file: by position, and then by kind."""
+  return record[2], UNPARSED if len(record) == 4 else record[3]
+
+
+
+class Writer(object):
+  """Writes records to the output file object.  Subclasses override the methods for the parts of the report."""
+
+  def __init__(self, out):
+    self.out = out
+
+
+  def begin(self):
+    """Starts the report."""
+
+
+  def beginFile(self, path):
+    """Starts the records for the given path."""
+
+
+  def error(self, path, line, column, position, kind, message):
+    """Writes an error."""
+
+
+  def unparsed(self, path, line, column, position, value):
+    """Writes a record of text that could not be parsed."""
+    self.error(path, line, column, position, UNPARSED, unparsedMessage(value))
+
+
+  def endFile(self, path):
+    """Ends the records for the given path."""
+
+
+  def end(self):
+    """Ends the report."""
+
+
+  def write(self, path, record):
+    """Writes a record in either form."""
+    if len(record) == 4:
+      self.unparsed(path, *record)
+    else:
+      self.error(path, *record)
+
+
+
+class JsonLinesWriter(Writer):
+  """Writes a JSON object per line for each record."""
+
+  def error(self, path, line, column, position, kind, message):
+    self._dump({'path': text(path), 'line': line, 'column': column, 'position': position, 'kind': kind,
+                'message': text(message)})
+
+
+  def unparsed(self, path, line, column, position, value):
+    self._dump({'path': text(path), 'line': line, 'column': column, 'position': position, 'kind': UNPARSED,
+                'text': text(value)})
+
+
+  def _dump(self, record):
+    """Writes a line of JSON."""
+    self.out.write(json.dumps(record, sort_keys=True))
+    self.out.write('\n')
+
+
+
+class CheckstyleWriter(Writer):
+  """Writes checkstyle XML, as read by most CI servers."""
+
+  def begin(self):
+    self.out.write('<?xml version="1.0" encoding="UTF-8"?>\n<checkstyle version="4.3">\n')
+
+
+  def beginFile(self, path):
+    self.out.write('<file name=%s>\n' % self._quote(path))
+
+
+  def error(self, path, line, column, position, kind, message):
+    self.out.write('<error line="%d" column="%d" severity="error" message=%s source=%s/>\n' % (
+        line, column, self._quote(message), self._quote('ocstyle.' + kind)))
+
+
+  def endFile(self, path):
+    self.out.write('</file>\n')
+
+
+  def end(self):
+    self.out.write('</checkstyle>\n')
+
+
+  @staticmethod
+  def _quote(value):
+    """Quotes an attribute value, replacing characters XML does not allow as text does undecodable bytes.  Done here
+    because xml.sax is slow to import."""
+    value = XML_INVALID.sub(u'\ufffd', text(value))
+    for character, escape in XML_ATTRIBUTE_ESCAPES:
+      value = value.replace(character, escape)
+    return ('"%s"' % value).encode('utf-8')
+
+
+
+class SarifWriter(Writer):
+  """Writes a SARIF 2.1.0 log, as read by code scanning tools."""
+
+  def __init__(self, out):
+    Writer.__init__(self, out)
+    self.separator = ''
+
+
+  def begin(self):
+    tool = {'driver': {'name': 'ocstyle', 'version': ocstyle.__version__,
+                       'informationUri': 'https://www.github.com/Cue/ocstyle'}}
+    self.out.write('{"version": "2.1.0", '
+                   '"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+                   '"runs": [{"tool": %s, "results": [\n' % json.dumps(tool, sort_keys=True))
+
+
+  def error(self, path, line, column, position, kind, message):
+    location = {'artifactLocation': {'uri': text(path)}}
+    if position is not None:
+      location['region'] = {'startLine': line, 'startColumn': column, 'byteOffset': position}
+    self.out.write(self.separator)
+    self.out.write(json.dumps({'ruleId': kind, 'level': 'error', 'message': {'text': text(message)},
+                               'locations': [{'physicalLocation': location}]}, sort_keys=True))
+    self.separator = ',\n'
+
+
+  def end(self):
+    self.out.write('\n]}]}\n')
+
+
+WRITERS = {
+  'jsonl': JsonLinesWriter,
+  'checkstyle': CheckstyleWriter,
+  'sarif': SarifWriter,
+}
@@ -0,0 +1,89 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for machine readable report formats."""
+
+import StringIO
+import json
+import unittest
+from xml.dom import minidom
+
+from ocstyle import formats
+
+
+RECORDS = [(3, 7, 19, 'MissingSpace', 'Expected 1, got 0'), (4, 1, 30, 'int \xff <x>;')]
+
+
+
+class WriterTest(unittest.TestCase):
+  """Tests for machine readable report formats."""
+
+  def write(self, writerClass):
+    """Writes the test records for two files and returns the output."""
+    out = StringIO.StringIO()
+    writer = writerClass(out)
+    writer.begin()
+    for path in ('a.m', 'b"&.h'):
+      writer.beginFile(path)
+      for record in RECORDS:
+        writer.write(path, record)
+      writer.endFile(path)
+    writer.end()
+    return out.getvalue()
+
+
+  def testJsonLines(self):
+    """Each record is a line of JSON."""
+    lines = [json.loads(line) for line in self.write(formats.JsonLinesWriter).splitlines()]
+    self.assertEquals(4, len(lines))
+    self.assertEquals({'path': 'a.m', 'line': 3, 'column': 7, 'position': 19, 'kind': 'MissingSpace',
+                       'message': 'Expected 1, got 0'}, lines[0])
+    self.assertEquals({'path': 'b"&.h', 'line': 4, 'column': 1, 'position': 30, 'kind': 'Unparsed',
+                       'text': u'int \ufffd <x>;'}, lines[3])
+
+
+  def testCheckstyle(self):
+    """Errors are grouped by file in checkstyle XML."""
+    files = minidom.parseString(self.write(formats.CheckstyleWriter)).getElementsByTagName('file')
+    self.assertEquals(['a.m', 'b"&.h'], [node.getAttribute('name') for node in files])
+    errors = files[0].getElementsByTagName('error')
+    self.assertEquals('3', errors[0].getAttribute('line'))
+    self.assertEquals('ocstyle.MissingSpace', errors[0].getAttribute('source'))
+    self.assertEquals('ocstyle.Unparsed', errors[1].getAttribute('source'))
+    self.assertEquals('4', errors[1].getAttribute('line'))
+
+
+  def testCheckstyleInvalidCharacters(self):
+    """Characters XML does not allow are replaced, so the report still parses."""
+    out = StringIO.StringIO()
+    writer = formats.CheckstyleWriter(out)
+    writer.begin()
+    writer.beginFile('a\x01.m')
+    writer.write('a\x01.m', (1, 1, 0, 'Bad', 'x\x00\x08\x0b\x0c\x1f\t\xed\xa0\x80\xef\xbf\xbe \xf0\x9f\x98\x80'))
+    writer.endFile('a\x01.m')
+    writer.end()
+    files = minidom.parseString(out.getvalue()).getElementsByTagName('file')
+    self.assertEquals(u'a\ufffd.m', files[0].getAttribute('name'))
+    self.assertEquals(u'x\ufffd\ufffd\ufffd\ufffd\ufffd\t\ufffd\ufffd \U0001f600',
+                      files[0].getElementsByTagName('error')[0].getAttribute('message'))
+
+
+  def testSarif(self):
+    """Errors are SARIF results."""
+    results = json.loads(self.write(formats.SarifWriter))['runs'][0]['results']
+    self.assertEquals(4, len(results))
+    self.assertEquals({'startLine': 3, 'startColumn': 7, 'byteOffset': 19},
+                      results[0]['locations'][0]['physicalLocation']['region'])
+    self.assertEquals('Unparsed', results[1]['ruleId'])
+    self.assertEquals('b"&.h', results[3]['locations'][0]['physicalLocation']['artifactLocation']['uri'])
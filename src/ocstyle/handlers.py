@@ -12,13 +12,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Objective C parse handlers."""
+"""Objective C parse handlers.
 
-from parcon import flatten
+Rules pass the errors of the rules inside them up as Errors nodes instead of flattened lists, so each rule only looks at
+the values of its own parsers however deeply it is nested.  The nodes are flattened once, by flatten, for the whole
+file or each top level part of it.
+"""
 
-import StringIO
+from ocstyle.error import Error, Span
 
-from ocstyle.error import Error
+
+
+class Errors(object):
+  """The errors found by the rules inside a rule, in order, each an Error or another Errors."""
+
+  __slots__ = ('parts',)
+
+
+  def __init__(self, parts):
+    self.parts = parts
+
+
+  def __repr__(self):
+    return 'Errors(%r)' % (self.parts,)
+
+
+def _parts(value, expandErrors=False):
+  """Yields the values other than None in the lists and tuples that parsers combine their values into, as
+  parcon.flatten does, and in Errors nodes if expandErrors is set."""
+  stack = [iter((value,))]
+  while stack:
+    for part in stack[-1]:
+      if isinstance(part, list) or type(part) is tuple or expandErrors and isinstance(part, Errors):
+        stack.append(iter(part.parts if isinstance(part, Errors) else part))
+        break
+      elif part is not None:
+        yield part
+    else:
+      stack.pop()
+
+
+def flatten(value):
+  """The strings and errors in value as a list, with Errors nodes flattened as well as lists and tuples."""
+  return list(_parts(value, True))
 
 
 def drop(*_):
@@ -27,44 +63,39 @@ def drop(*_):
 
 
 def justErrors(value):
-  """Check value and ensure it contains no text, only errors (or nothing)."""
+  """Check value and ensure it contains no text, only errors (or nothing).  Returns the errors as an Errors node."""
   if not value:
     return None
 
-  if not isinstance(value, list):
-    value = [value]
-
   result = []
-  for part in flatten(value):
+  for part in _parts(value):
     if part:
-      if not isinstance(part, Error):
+      if not isinstance(part, (Error, Errors)):
         raise Exception('Got %r when expecting only errors' % part)
       else:
         result.append(part)
 
-  return value
+  if not result:
+    return None
+  return result[0] if len(result) == 1 else Errors(result)
 
 
 def stringsAndErrors(value):
-  """Aggregate both unparsed strings and errors."""
+  """Aggregate both unparsed text and errors, joining the spans of unparsed text that no error comes between."""
   if not value:
     return None
 
-  if not isinstance(value, list):
-    value = [value]
-
   result = []
-  lastStringPart = None
-  for part in flatten(value):
-    if isinstance(part, basestring):
-      lastStringPart = lastStringPart or StringIO.StringIO()
-      lastStringPart.write(part)
+  spans = []
+  for part in _parts(value):
+    if isinstance(part, Span):
+      spans.append(part)
     else:
-      if lastStringPart:
-        result.append(lastStringPart.getvalue())
-        lastStringPart = None
+      if spans:
+        result.append(Span.join(spans))
+        spans = []
       if part:
         result.append(part)
-  if lastStringPart:
-    result.append(lastStringPart.getvalue())
+  if spans:
+    result.append(Span.join(spans))
   return result
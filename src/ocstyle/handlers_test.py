@@ -0,0 +1,65 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the parse handlers."""
+
+import unittest
+
+from ocstyle import handlers
+from ocstyle.error import Error, Span
+
+
+
+class HandlersTest(unittest.TestCase):
+  """Tests for the parse handlers."""
+
+  def error(self, position):
+    """An error at the given position."""
+    return Error('Kind', 'message', position, None)
+
+
+  def testJustErrors(self):
+    """Errors are kept in order in a node, a single error is passed up as it is, and text is rejected."""
+    first, second = self.error(1), self.error(2)
+    self.assertEquals(None, handlers.justErrors((None, [None, ()])))
+    self.assertTrue(handlers.justErrors([(None, first)]) is first)
+    node = handlers.justErrors([(first, None), [handlers.justErrors(second)]])
+    self.assertEquals([first, second], handlers.flatten(node))
+    self.assertRaises(Exception, handlers.justErrors, [first, 'text'])
+
+
+  def testStringsAndErrors(self):
+    """Unparsed spans are joined unless an error, or a node of them, comes between."""
+    first, second = self.error(1), self.error(2)
+    node = handlers.justErrors([first, second])
+    content = 'ab cd'
+    a, b, d = Span(content, ((0, 1),), None), Span(content, ((1, 2),), None), Span(content, ((4, 5),), None)
+
+    joined = handlers.stringsAndErrors([a, None, (b, None), d])
+    self.assertEquals([((0, 2), (4, 5))], [span.ranges for span in joined])
+    self.assertEquals('abd', joined[0].text())
+    self.assertEquals(0, joined[0].position)
+
+    parts = handlers.stringsAndErrors([a, (node, b)])
+    self.assertEquals([a, node, b], parts)
+    self.assertEquals([a, first, second, b], handlers.flatten(parts))
+
+
+  def testDeepNesting(self):
+    """Nodes nested more deeply than the recursion limit are flattened."""
+    errors = [self.error(i) for i in range(5000)]
+    node = None
+    for err in reversed(errors):
+      node = handlers.justErrors((err, (node,)))
+    self.assertEquals(errors, handlers.flatten([node]))
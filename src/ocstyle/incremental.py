@@ -0,0 +1,231 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checks a file again after an edit by parsing only the parts of it that the edit can change, for editors.
+
+A file is a sequence of top level parts, each parsed from where the last one ended, so the parse from any position
+where a part starts is the same whatever came before it.  The body of an implementation or namespace is a sequence of
+parts in the same way.  Each part records its reach: how far into the text its parse looked.  After an edit, parsing
+starts again at the first part whose reach gets to the edit, inside the body of the part around the edit if only its
+body changed, and stops as soon as a part ends where an old part after the edit started.  From there on the text is
+the same, so the old parts are kept with their positions moved.  Old parts are only reused from the line after the
+edit on, since a part looks back to the start of its line for indentation.
+"""
+
+from ocstyle import parsing
+from ocstyle.error import Error, Span
+from ocstyle.handlers import flatten, stringsAndErrors
+
+
+
+class Part(object):
+  """A part of the file parsed in one go, with its errors and unparsed text.
+
+  A container part has the values of its opening in values, followed by the parts of its body as children, and the
+  parser of its closing.
+  """
+
+  __slots__ = ('start', 'end', 'reach', 'values', 'children', 'bodyStart', 'openingReach', 'closing')
+
+
+  def __init__(self, start, end, reach, values):
+    self.start = start
+    self.end = end
+    self.reach = reach
+    self.values = values
+    self.children = None
+    self.bodyStart = None
+    self.openingReach = None
+    self.closing = None
+
+
+  def moved(self, delta, content, lines):
+    """The part with its positions moved by delta, for the given content of the file."""
+    part = Part(self.start + delta, self.end + delta, self.reach + delta,
+                [_movedValue(value, delta, content, lines) for value in self.values])
+    if self.children is not None:
+      part.children = [child.moved(delta, content, lines) for child in self.children]
+      part.bodyStart = self.bodyStart + delta
+      part.openingReach = self.openingReach + delta
+      part.closing = self.closing
+    return part
+
+
+  def collect(self, values):
+    """Appends the errors and unparsed text of the part to values, in order."""
+    values.extend(self.values)
+    for child in self.children or ():
+      child.collect(values)
+
+
+def _movedValue(value, delta, content, lines):
+  """The error or unparsed text with its positions moved by delta."""
+  if isinstance(value, Span):
+    return Span(content, tuple((start + delta, end + delta) for start, end in value.ranges), lines)
+  if not delta:
+    return value
+  edit = value.edit and (value.edit[0] + delta, value.edit[1] + delta, value.edit[2])
+  return Error(value.kind, value.message, value.position + delta, lines, edit)
+
+
+
+class Edit(object):
+  """A replacement of removedLength characters at position with text, and where old parts parse the same after it."""
+
+  __slots__ = ('position', 'removedEnd', 'delta', 'stable')
+
+
+  def __init__(self, content, position, removedLength, text):
+    self.position = position
+    self.removedEnd = position + removedLength
+    self.delta = len(text) - removedLength
+    newline = content.find('\n', self.removedEnd)
+    self.stable = newline + 1 if newline != -1 else len(content) + 1
+
+
+
+class ParseState(object):
+  """The parts of a file as last parsed, updated in place for each edit."""
+
+  def __init__(self, path, content, maxLineLength=120):
+    # Memoized results would not record their reach, so nothing is memoized.
+    self.context = parsing.CheckContext(content, maxLineLength, 0, not path.endswith(('.m', '.mm')))
+    self.context.reach = parsing.Reach(content)
+    with self.context:
+      self.parts = self._parseFrom(0, self._parsePart, [])
+
+
+  @property
+  def content(self):
+    """The text of the file."""
+    return self.context.content
+
+
+  def edit(self, position, removedLength, text):
+    """Replaces removedLength characters at position with text, and parses the parts that can change again."""
+    edit = Edit(self.context.content, position, removedLength, text)
+    self.context.edit(position, removedLength, text)
+    self.context.reach = parsing.Reach(self.context.content)
+    with self.context:
+      self.parts = self._update(self.parts, 0, self._parsePart, edit)
+
+
+  def check(self):
+    """The errors and unparsed text of the file, as main.checkFile returns them."""
+    values = []
+    for part in self.parts:
+      part.collect(values)
+    result = self.context.suppressions().filter(stringsAndErrors(values) or [])
+    result.extend(self.context.lineErrors())
+    result.sort(key=lambda err: err.position if isinstance(err, Error) else 0)
+    return result
+
+
+  def _update(self, parts, start, parse, edit):
+    """The given parts of a sequence that starts at start, updated for the edit and parsed with parse."""
+    first = 0
+    while first < len(parts) and parts[first].reach <= edit.position:
+      first += 1
+    content, lines = self.context.content, self.context.lines
+    result = [part.moved(0, content, lines) for part in parts[:first]]
+    if first == len(parts):
+      return self._parseFrom(parts[-1].end if parts else start, parse, result, parts, edit)
+
+    part = parts[first]
+    position = part.start
+    if part.children is not None and part.openingReach <= edit.position and \
+       edit.removedEnd <= (part.children[-1].end if part.children else part.bodyStart):
+      container = Part(part.start, None, part.openingReach, [_movedValue(value, 0, content, lines)
+                                                             for value in part.values])
+      container.bodyStart = part.bodyStart
+      container.openingReach = part.openingReach
+      children = self._update(part.children, part.bodyStart, self._bodyParser(part.closing), edit)
+      container = self._close(container, part.closing, children)
+      if container is not None: # Otherwise the body no longer closes, so the part is parsed again as a whole.
+        result.append(container)
+        position = container.end
+    return self._parseFrom(position, parse, result, parts, edit)
+
+
+  def _parseFrom(self, position, parse, result, oldParts=(), edit=None):
+    """Appends the parts parsed from position to result, until one ends where an old part after the edit started, and
+    then the old parts from there on.  Returns result."""
+    resync = {}
+    if edit is not None:
+      resync = dict((part.start + edit.delta, index) for index, part in enumerate(oldParts)
+                    if part.start >= edit.stable)
+    while True:
+      index = resync.get(position)
+      if index is not None:
+        content, lines = self.context.content, self.context.lines
+        result.extend(part.moved(edit.delta, content, lines) for part in oldParts[index:])
+        return result
+      part = parse(position)
+      if part is None:
+        return result
+      result.append(part)
+      position = part.end
+
+
+  def _measure(self, parser, position):
+    """Parses at position, returning the result and how far the parse looked."""
+    reach = self.context.reach
+    reach.position = position
+    content = self.context.content
+    result = parser.parse(content, position, len(content), parsing.NO_SPACE)
+    reach.add(result)
+    return result, reach.position + reach.LOOKAHEAD
+
+
+  def _parsePart(self, position):
+    """The top level part, or part of a body, that starts at position, or None at the end of the file."""
+    if position >= len(self.context.content):
+      return None
+    rules = self.context.rules
+    for opening, closing in rules.CONTAINERS:
+      result, reach = self._measure(opening, position)
+      if result:
+        container = Part(position, None, reach, flatten(result.value))
+        container.bodyStart = result.end
+        container.openingReach = reach
+        container = self._close(container, closing, self._parseFrom(result.end, self._bodyParser(closing), []))
+        if container is not None:
+          return container
+        break
+    result, reach = self._measure(rules.filePart, position)
+    return Part(position, result.end, reach, flatten(result.value)) if result else None
+
+
+  def _bodyParser(self, closing):
+    """A function parsing the part of a body that starts at a position, or returning None where the body ends."""
+    def parse(position):
+      """Parses a part of the body, like filePart - closing."""
+      if self._measure(closing, position)[0]:
+        return None
+      return self._parsePart(position)
+    return parse
+
+
+  def _close(self, container, closing, children):
+    """Finishes the container part with the given body parts and its closing, or returns None if it does not close."""
+    bodyEnd = children[-1].end if children else container.bodyStart
+    attemptReach = self._measure(self.context.rules.filePart, bodyEnd)[1] # The body stops after trying this.
+    result, reach = self._measure(closing, bodyEnd)
+    if not result:
+      return None
+    container.end = result.end
+    container.reach = max([container.openingReach, attemptReach, reach] + [child.reach for child in children])
+    container.children = children
+    container.closing = closing
+    return container
@@ -0,0 +1,83 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for checking files again after edits."""
+
+import os.path
+import pkg_resources
+import random
+import StringIO
+import unittest
+
+from ocstyle import incremental, main
+
+
+METHOD = '- (void)method%d {\n  int  x = %d;\n}\n\n\n'
+
+
+
+class ParseStateTest(unittest.TestCase):
+  """Tests for checking files again after edits."""
+
+  def assertSameCheck(self, path, state):
+    """Checking the edited file again gives the same result as checking it from scratch."""
+    expected = main.checkFile(path, StringIO.StringIO(state.content))
+    self.assertEquals([str(part) if isinstance(part, main.Error) else repr(part.text()) for part in expected],
+                      [str(part) if isinstance(part, main.Error) else repr(part.text()) for part in state.check()])
+
+
+  def testRandomEdits(self):
+    """Sample files check the same after each of a series of edits."""
+    pieces = ['\n', ' ', ';', '"', '{', '}', '/*', '*/', '@end\n', '- (void)x {\n', 'namespace a {\n']
+    generator = random.Random(5)
+    for filename in ('Parsing.h', 'Parsing.m'):
+      state = incremental.ParseState(filename,
+                                     pkg_resources.resource_string('ocstyle', os.path.join('testdata', filename)))
+      self.assertSameCheck(filename, state)
+      for _ in range(15):
+        position = generator.randint(0, len(state.content))
+        state.edit(position, min(generator.randint(0, 3), len(state.content) - position), generator.choice(pieces))
+        self.assertSameCheck(filename, state)
+
+
+  def testEditParsesOnlyThePartOfTheBody(self):
+    """An edit inside a method of an implementation parses that method again, and keeps the others."""
+    content = '@implementation A\n\n' + ''.join(METHOD % (i, i) for i in range(20)) + '@end\n'
+    state = incremental.ParseState('A.m', content)
+    parsed = []
+    parsePart = state._parsePart # pylint: disable=W0212
+    state._parsePart = lambda position: parsed.append(position) or parsePart(position) # pylint: disable=W0212
+    position = content.index('int  x = 10')
+    state.edit(position, 3, 'long')
+    self.assertEquals([position - len('- (void)method10 {\n  ')], parsed)
+    self.assertSameCheck('A.m', state)
+
+
+  def testClosingQuoteAfterOpeningOne(self):
+    """A part that scanned to the end of the file for a closing delimiter is parsed again when one is typed."""
+    content = '@implementation A\n' + METHOD % (1, 1) + '@end\n'
+    state = incremental.ParseState('A.m', content)
+    state.edit(content.index('int'), 0, '"')
+    self.assertSameCheck('A.m', state)
+    state.edit(len(state.content) - 1, 0, '"')
+    self.assertSameCheck('A.m', state)
+
+
+  def testLinesMove(self):
+    """Errors after an edit move to their new lines."""
+    state = incremental.ParseState('A.m', '@implementation A\n' + METHOD % (1, 1) + '@end\n')
+    before = [err.lineAndColumn() for err in state.check()]
+    state.edit(0, 0, '\n\n')
+    self.assertEquals([(line + 2, column) for line, column in before], [err.lineAndColumn() for err in state.check()])
+    self.assertSameCheck('A.m', state)
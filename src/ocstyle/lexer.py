@@ -0,0 +1,67 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Objective C lexer."""
+
+import array
+import bisect
+import re
+
+
+COMMENT, STRING, CHARACTER, DIRECTIVE, IDENTIFIER, NUMBER, SPACE, NEWLINE, PUNCTUATION = range(1, 10)
+
+# Group numbers match the token kinds above, so Match.lastindex is the kind.
+TOKEN = re.compile(r'''
+    (//[^\n]*|/\*(?:[^*]|\*(?!/))*\*/)
+  | (@?"(?:[^"\\]|\\.)*")
+  | ('(?:[^'\\\n]|\\.)*')
+  | (\#(?:[^\\\n]|\\.|\\\n)*)
+  | ([a-zA-Z_][a-zA-Z0-9_]*)
+  | (\.?\d(?:[eEpP][+-]|[a-zA-Z0-9_.])*)
+  | ([ \t]+)
+  | (\n)
+  | (.)
+''', re.VERBOSE | re.DOTALL)
+
+
+
+class Tokens(object):
+  """The tokens of a file, stored as the start position and kind of each token.
+
+  Tokens cover the whole file with no gaps, so each token ends where the next one starts.
+  """
+
+  __slots__ = ('content', 'starts', 'kinds')
+
+
+  def __init__(self, content):
+    self.content = content
+    matches = list(TOKEN.finditer(content))
+    self.starts = array.array('l', [m.start() for m in matches])
+    self.starts.append(len(content))
+    self.kinds = array.array('b', [m.lastindex for m in matches])
+
+
+  def __len__(self):
+    return len(self.kinds)
+
+
+  def indexAt(self, position):
+    """Index of the token containing the given position."""
+    return bisect.bisect_right(self.starts, position) - 1
+
+
+  def end(self, index):
+    """End position of the token with the given index."""
+    return self.starts[index + 1]
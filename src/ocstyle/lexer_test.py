@@ -0,0 +1,48 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the Objective C lexer."""
+
+import unittest
+
+from ocstyle import lexer
+
+
+
+class TokensTest(unittest.TestCase):
+  """Tests for the Objective C lexer."""
+
+  def assertTokens(self, content, expected):
+    """Check that the content is split in to the expected (kind, text) tokens."""
+    tokens = lexer.Tokens(content)
+    self.assertEquals(expected, [(tokens.kinds[i], content[tokens.starts[i]:tokens.end(i)]) for i in range(len(tokens))])
+
+
+  def testTokens(self):
+    """Each kind of token is recognized."""
+    self.assertTokens('#import "A.h"\nx  = @"a\\"b"; // c\n', [
+        (lexer.DIRECTIVE, '#import "A.h"'), (lexer.NEWLINE, '\n'), (lexer.IDENTIFIER, 'x'), (lexer.SPACE, '  '),
+        (lexer.PUNCTUATION, '='), (lexer.SPACE, ' '), (lexer.STRING, '@"a\\"b"'), (lexer.PUNCTUATION, ';'),
+        (lexer.SPACE, ' '), (lexer.COMMENT, '// c'), (lexer.NEWLINE, '\n')])
+    self.assertTokens("c = 'x' + 0x1F + 1.5e-3f;/* a\n */", [
+        (lexer.IDENTIFIER, 'c'), (lexer.SPACE, ' '), (lexer.PUNCTUATION, '='), (lexer.SPACE, ' '),
+        (lexer.CHARACTER, "'x'"), (lexer.SPACE, ' '), (lexer.PUNCTUATION, '+'), (lexer.SPACE, ' '),
+        (lexer.NUMBER, '0x1F'), (lexer.SPACE, ' '), (lexer.PUNCTUATION, '+'), (lexer.SPACE, ' '),
+        (lexer.NUMBER, '1.5e-3f'), (lexer.PUNCTUATION, ';'), (lexer.COMMENT, '/* a\n */')])
+
+
+  def testUnterminated(self):
+    """Unterminated strings and comments fall back to punctuation."""
+    self.assertTokens('"a', [(lexer.PUNCTUATION, '"'), (lexer.IDENTIFIER, 'a')])
+    self.assertTokens('/*', [(lexer.PUNCTUATION, '/'), (lexer.PUNCTUATION, '*')])
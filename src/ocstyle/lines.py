@@ -0,0 +1,112 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Line position data for a file."""
+
+import array
+import bisect
+import re
+
+
+NEWLINE = re.compile('\n')
+
+TAB_SIZE = 4
+
+
+
+class LineIndex(object):
+  """Positions of the newlines in a file, for converting positions to lines and columns.
+
+  Entry 0 is 0, and entry n is the position of the newline that ends line n.
+  """
+
+  __slots__ = ('content', 'newlines', 'tabSize')
+
+
+  def __init__(self, content, tabSize=TAB_SIZE):
+    self.content = content
+    self.tabSize = tabSize
+    self.newlines = array.array('l', [0])
+    self.newlines.fromlist([m.start() for m in NEWLINE.finditer(content)])
+
+
+  def __len__(self):
+    return len(self.newlines)
+
+
+  def __getitem__(self, lineNumber):
+    return self.newlines[lineNumber]
+
+
+  def lineAndOffset(self, position):
+    """Return the line of the given position, and its offset from the newline before it."""
+    line = bisect.bisect_left(self.newlines, position)
+    return line, position - self.newlines[line - 1]
+
+
+  def linesAndOffsets(self, positions):
+    """Yields lineAndOffset for each of the given positions, searching on from the line of the one before while they
+    are in order."""
+    newlines = self.newlines
+    line = 0
+    previous = 0
+    for position in positions:
+      line = bisect.bisect_left(newlines, position, line if position >= previous else 0)
+      previous = position
+      yield line, position - newlines[line - 1]
+
+
+  def lineText(self, position):
+    """The text of the line containing the given position, without its newline."""
+    line = max(bisect.bisect_left(self.newlines, position), 1)
+    start = self.newlines[line - 1] + 1 if line > 1 else 0
+    end = self.newlines[line] if line < len(self.newlines) else len(self.content)
+    return self.content[start:end]
+
+
+  def column(self, position, line=None):
+    """The 1 based column of the given position, with tabs expanded.  Its line saves looking it up, if known."""
+    if line is None:
+      line = bisect.bisect_left(self.newlines, position)
+    start = self.newlines[line - 1] + 1 if line > 1 else 0
+    return len(self.content[start:position].expandtabs(self.tabSize)) + 1
+
+
+  def edit(self, position, removedLength, text):
+    """Replaces removedLength characters at position with text, updating the newlines in place.
+
+    Only the newlines in the inserted text are searched for; those after it are moved.
+    """
+    removedEnd = position + removedLength
+    delta = len(text) - removedLength
+    newlines = self.newlines
+    first = bisect.bisect_left(newlines, position, 1)
+    after = bisect.bisect_left(newlines, removedEnd, first)
+    moved = array.array('l', [position + m.start() for m in NEWLINE.finditer(text)])
+    moved.extend([newline + delta for newline in newlines[after:]])
+    newlines[first:] = moved
+    self.content = self.content[:position] + text + self.content[removedEnd:]
+
+
+  def longLines(self, maxLineLength):
+    """Yields (newline position, length) for each newline terminated line longer than maxLineLength."""
+    content = self.content
+    position = content.find('\n')
+    if position - 1 > maxLineLength: # Line 1 is measured from the 0 entry, not from a newline.
+      yield position, position - 1
+    for m in re.finditer(r'\n[^\n]{%d}' % (maxLineLength + 1), content):
+      position = content.find('\n', m.end())
+      if position == -1:
+        break
+      yield position, position - m.start() - 1 # Remove the \n character.
@@ -0,0 +1,67 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for line position data."""
+
+import unittest
+
+from ocstyle.lines import LineIndex
+
+
+
+class LineIndexTest(unittest.TestCase):
+  """Tests for line position data."""
+
+  def testLineAndOffset(self):
+    """Positions are converted to lines and offsets one at a time or in a batch."""
+    index = LineIndex('ab\ncd\n\nef')
+    positions = [1, 2, 4, 5, 6, 8]
+    expected = [(1, 1), (1, 2), (2, 2), (2, 3), (3, 1), (4, 2)]
+    self.assertEquals(expected, [index.lineAndOffset(position) for position in positions])
+    self.assertEquals(expected, list(index.linesAndOffsets(positions)))
+    self.assertEquals(expected[::-1], list(index.linesAndOffsets(positions[::-1])))
+
+
+  def testColumn(self):
+    """Columns count from 1 and expand tabs."""
+    index = LineIndex('ab\n\tcd\n  \tx', 4)
+    self.assertEquals(2, index.column(1))
+    self.assertEquals(1, index.column(3))
+    self.assertEquals(5, index.column(4))
+    self.assertEquals(6, index.column(5))
+    self.assertEquals(5, index.column(10))
+
+
+  def testLongLines(self):
+    """Only newline terminated lines over the limit are reported."""
+    index = LineIndex('x' * 12 + '\nshort\n' + 'y' * 11 + '\n' + 'z' * 20)
+    self.assertEquals([(12, 11), (30, 11)], list(index.longLines(10)))
+
+
+  def testEdit(self):
+    """Editing the text moves the newlines after the edit and finds those in the inserted text."""
+    index = LineIndex('ab\ncd\n\nef\ngh')
+    index.edit(4, 4, 'x\ny\nz')
+    self.assertEquals('ab\ncx\ny\nzf\ngh', index.content)
+    self.assertEquals(list(LineIndex(index.content).newlines), list(index.newlines))
+    index.edit(0, 0, '\n')
+    index.edit(len(index.content), 0, 'i\n')
+    self.assertEquals(list(LineIndex(index.content).newlines), list(index.newlines))
+
+
+  def testLineText(self):
+    """The text of a line is found from any position in it, including the newline that ends it."""
+    index = LineIndex('ab\ncd\n\nef')
+    self.assertEquals(['ab', 'ab', 'ab', 'cd', '', 'ef', 'ef'], [index.lineText(position) for position in
+                                                                 (0, 1, 2, 3, 6, 7, 9)])
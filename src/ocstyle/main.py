@@ -15,49 +15,512 @@
 
 """Basic Objective C style checker."""
 
-import argparse
+import collections
+import functools
+import itertools
 import os.path
+import signal
 import sys
 
-import parcon
+from ocstyle import cache, client, discovery, formats
+from ocstyle.error import Error, Span
 
-from ocstyle import rules
+# Building the grammar takes most of the time to start up, so parcon and the rules are imported when they are needed.
+# Header and implementation files have their own variants of the grammar, and each is only built for the first file
+# that needs it.
 
 
-def check(path, maxLineLength):
-  """Style checks the given path."""
+
+class Options(collections.namedtuple('Options', 'maxLineLength jobs resultCache memoEntries splitJobs baseline fix '
+                                                'outputFormat maxErrors')):
+  """How to check files and report the results, as set on the command line.
+
+  With more than one job, files are checked by a pool of forked workers, or one per core for 0.  The given ResultCache
+  is used if any, and up to memoEntries parse results are memoized if that is not 0.  Unless splitJobs is 1, a large
+  file checked on its own is parsed in chunks on that many processes, or one per core for 0.  Errors in the given
+  baseline.Baseline are left out.  With fix set, files are rewritten with the fixes for their errors.  Unless maxErrors
+  is 0, checking stops once that many errors or unparsed parts are found.
+  """
+
+  def __new__(cls, maxLineLength=120, jobs=1, resultCache=None, memoEntries=0, splitJobs=1, baseline=None, fix=False,
+              outputFormat='text', maxErrors=0):
+    return super(Options, cls).__new__(cls, maxLineLength, jobs, resultCache, memoEntries, splitJobs, baseline, fix,
+                                       outputFormat, maxErrors)
+
+
+DEFAULT_OPTIONS = Options()
+
+
+def check(path, options=DEFAULT_OPTIONS):
+  """Style checks the given path.
+
+  With fix set, the file is rewritten with the fixes for the errors found, and the fixed file is checked again.
+  """
   with open(path) as f:
-    return checkFile(path, f, maxLineLength)
+    if not options.fix:
+      return checkFile(path, f, options)
+    content = f.read()
+
+  import StringIO
+  from ocstyle import autofix
+  parts = checkFile(path, StringIO.StringIO(content), options)
+  fixed = autofix.fixFile(path, content, parts)
+  if fixed is None:
+    return parts
+  return checkFile(path, StringIO.StringIO(fixed), options)
+
+
+def checkFile(path, f, options=DEFAULT_OPTIONS):
+  """Style checks the given file object.
 
+  With maxErrors set, line errors are found first, and parsing stops at the end of the top level part where the limit
+  is reached.  That result is incomplete, so it is neither cached nor split.
+  """
+  if options.maxErrors:
+    result = list(itertools.islice(iterCheckFile(path, f, options, True), options.maxErrors))
+    result.sort(key=lambda err: err.position if isinstance(err, Error) else 0)
+    return result
 
-def checkFile(path, f, maxLineLength):
-  """Style checks the given file object."""
   content = f.read()
-  lineErrors = rules.setupLines(content, maxLineLength)
-  result = parcon.Exact(rules.entireFile).parse_string(content)
-  if path.endswith(('.m', '.mm')):
-    result = [err for err in result if not isinstance(err, rules.Error) or not err.kind.endswith('InHeader')]
+  implementation = path.endswith(('.m', '.mm'))
+  resultCache, baseline = options.resultCache, options.baseline
+  if resultCache:
+    from ocstyle.lines import LineIndex
+    key = resultCache.key(content, options.maxLineLength, implementation)
+    result = resultCache.get(key, LineIndex(content))
+    if result is not None:
+      return list(baseline.filter(path, result)) if baseline else result
+
+  import parcon
+  from ocstyle import parsing
+
+  context = parsing.CheckContext(content, options.maxLineLength, options.memoEntries, not implementation)
+  lineErrors = context.lineErrors()
+  if options.splitJobs == 1:
+    with context:
+      result = parcon.Exact(context.rules.entireFile, parsing.NO_SPACE).parse_string(content)
+  else:
+    from ocstyle import split
+    result = split.parse(context, options.splitJobs)
+  result = context.suppressions().filter(result)
   result.extend(lineErrors)
-  result.sort(key=lambda err: err.position if isinstance(err, rules.Error) else 0)
-  return result
+  result.sort(key=lambda err: err.position if isinstance(err, Error) else 0)
+  if resultCache:
+    resultCache.put(key, result)
+  return list(baseline.filter(path, result)) if baseline else result
 
 
-def main():
-  """Main body of the script."""
+def iterCheckFile(path, f, options=DEFAULT_OPTIONS, lineErrorsFirst=False):
+  """Style checks the given file object, yielding each error as soon as the top level part of the file containing it
+  has been parsed.
 
-  parser = argparse.ArgumentParser()
-  parser.add_argument("--maxLineLength", action="store", type=int, default=120, help="Maximum line length")
-  args, filenames = parser.parse_known_args()
+  The errors of each part are yielded in position order, merged with the line errors before the end of the part, or
+  after all the line errors if lineErrorsFirst is set.  Text that could not be parsed is yielded as a Span once an
+  error after it is found, or at the end of the file.  Errors in the given baseline.Baseline are left out.
+  """
+  if options.baseline:
+    for part in options.baseline.filter(path, iterCheckFile(path, f, options._replace(baseline=None), lineErrorsFirst)):
+      yield part
+    return
+
+  from ocstyle import handlers, parsing
+
+  content = f.read()
+  context = parsing.CheckContext(content, options.maxLineLength, options.memoEntries, not path.endswith(('.m', '.mm')))
+  filePart = context.rules.filePart
+  suppressions = context.suppressions()
+  lineErrors = context.lineErrors()
+  lineIndex = 0
+  if lineErrorsFirst: # They take no parsing to find, so a caller that stops early may not need to parse at all.
+    for err in lineErrors:
+      yield err
+    lineIndex = len(lineErrors)
+  unparsed = []
+  position = 0
+  while position < len(content):
+    with context: # Only while parsing, so other checks can run between parts.
+      result = filePart.parse(content, position, len(content), parsing.NO_SPACE)
+    position = result.end
+
+    errors = []
+    for part in handlers.flatten(result.value):
+      if isinstance(part, Span):
+        unparsed.append(part)
+      else:
+        if unparsed:
+          yield Span.join(unparsed)
+          unparsed = []
+        if not suppressions.suppresses(part.kind, part.position):
+          errors.append(part)
+
+    errors.sort(key=lambda err: err.position)
+    for err in errors:
+      while lineIndex < len(lineErrors) and lineErrors[lineIndex].position < err.position:
+        yield lineErrors[lineIndex]
+        lineIndex += 1
+      yield err
+    while lineIndex < len(lineErrors) and lineErrors[lineIndex].position < position:
+      yield lineErrors[lineIndex]
+      lineIndex += 1
+
+  if unparsed:
+    yield Span.join(unparsed)
+  for err in lineErrors[lineIndex:]:
+    yield err
+
+
+def iterCheck(paths, options=DEFAULT_OPTIONS):
+  """Style checks the given paths, yielding (path, error) as each error is found.
+
+  Unparsed text is yielded in place of an error as a Span, as with iterCheckFile.
+  """
+  for path in paths:
+    if not os.path.isdir(path):
+      with open(path) as f:
+        for part in iterCheckFile(path, f, options):
+          yield path, part
+
+
+def located(parts):
+  """Yields (part, line, offset) for each of the given results of checking a file, with the line and offset of
+  lineAndOffset, looking up the lines of all the parts in one pass."""
+  parts, positions = itertools.tee(parts)
+  offsets = None
+  for part in parts:
+    if offsets is None:
+      offsets = part.lines.linesAndOffsets(other.position for other in positions)
+    line, offset = next(offsets)
+    yield part, line, offset
+
+
+def formatLines(parts):
+  """Returns the report line for each of the given results of checking a file."""
+  return [('ERROR: %s' % part.describe(line, offset)) if isinstance(part, Error) else ('unparsed: %r' % part.text())
+          for part, line, offset in located(parts)]
+
+
+def formatReport(filename, parts):
+  """Returns the report text for the given results of checking a file."""
+  return _reportText(filename, formatLines(parts))
+
+
+def _reportText(filename, lines):
+  """Returns the report text for a file given its report lines."""
+  return '\n'.join([filename] + lines + ['']) + '\n'
+
+
+def checkAndFormat(filename, options):
+  """Style checks, and fixes if fix is set, the given path and returns it with its report lines, or None for a
+  directory."""
+  if os.path.isdir(filename):
+    return filename, None
+  return filename, formatLines(check(filename, options))
+
+
+def records(parts):
+  """Converts errors to (line, column, position, kind, message) records for formats.Writer, and unparsed text to
+  (line, column, position, text) records."""
+  for part, line, _ in located(parts):
+    line, column = max(line, 1), part.lines.column(part.position, line)
+    if isinstance(part, Error):
+      yield line, column, part.position, part.kind, part.message
+    else:
+      yield line, column, part.position, part.text()
+
+
+def checkFingerprints(filename, options):
+  """Style checks the given path, without a baseline, and returns the baseline fingerprint of each error and unparsed
+  part."""
+  from ocstyle import baseline
+  return [fingerprint for fingerprint, _ in baseline.fingerprints(filename, check(filename, options))]
+
+
+def checkRecords(filename, options):
+  """Style checks, and fixes if fix is set, the given path and returns it with the list of records for it."""
+  return filename, list(records(check(filename, options)))
+
+
+def _initWorker():
+  """Leave interrupt handling to the parent process."""
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
 
+
+def _mapFiles(worker, filenames, jobs):
+  """Yields worker(filename) for each of the given paths, in order, using a pool of jobs processes if that is not 1."""
+  if jobs == 1:
+    for filename in filenames:
+      yield worker(filename)
+    return
+
+  import multiprocessing
+  from ocstyle import parsing
+  for header in (True, False): # Build the grammars before forking, so the workers share them.
+    parsing.grammar(header)
+  pool = multiprocessing.Pool(jobs or None, _initWorker)
+  try:
+    for result in pool.imap(worker, filenames, 4):
+      yield result
+    pool.close()
+  finally:
+    pool.terminate()
+    pool.join()
+
+
+def checkAll(filenames, options=DEFAULT_OPTIONS):
+  """Yields (path, report lines) for each of the given paths, in order, with None for the lines of a directory.
+
+  With more than one job the files are checked by a pool of forked workers.  The grammar is built before the workers
+  are forked, so they share it with the parent instead of building their own.  Files are only split when they are
+  checked one at a time.
+  """
+  return _mapFiles(functools.partial(checkAndFormat, options=options), filenames, options.jobs)
+
+
+def checkAllRecords(filenames, options=DEFAULT_OPTIONS):
+  """Yields (path, records) for each of the given files, skipping directories, in order."""
+  filenames = (filename for filename in filenames if not os.path.isdir(filename))
+  return _mapFiles(functools.partial(checkRecords, options=options), filenames, options.jobs)
+
+
+def _upTo(results, maxErrors):
+  """Yields the given (path, errors) results, cutting the errors so that there are at most maxErrors in all unless that
+  is 0.  Stops, and closes results so no more files are checked, once that many are found."""
+  if not maxErrors:
+    for result in results:
+      yield result
+    return
+
+  count = 0
+  try:
+    for filename, found in results:
+      if found is not None:
+        found = list(itertools.islice(found, maxErrors - count))
+        count += len(found)
+      yield filename, found
+      if count >= maxErrors:
+        break
+  finally:
+    results.close()
+
+
+def writeReport(out, filenames, options=DEFAULT_OPTIONS):
+  """Style checks the given paths and writes the report to out in the output format, as each file is checked.
+
+  With fix set, each file is rewritten with the fixes for its errors, and only what is left is reported.  With
+  maxErrors set, no more than that many errors or unparsed parts are reported, and no files are checked after that.
+  """
+  if options.outputFormat == 'text':
+    for filename, lines in _upTo(checkAll(filenames, options), options.maxErrors):
+      out.write('\n' if lines is None else _reportText(filename, lines))
+    return
+
+  writeRecords(formats.WRITERS[options.outputFormat](out),
+               _upTo(checkAllRecords(filenames, options), options.maxErrors))
+
+
+def watchReport(out, paths, excludeGlobs, options):
+  """Style checks the files for the given command line paths and writes the report as writeReport does, and then
+  checks each file again and writes its report whenever it changes, until interrupted.
+
+  Directories are searched as with --recursive.  The grammar stays built between checks, so a changed file is checked
+  as soon as it is saved.
+  """
+  from ocstyle import watch
+
+  def checkFiles(filenames):
+    """Checks the given files, in parallel only if there are several."""
+    writeReport(out, filenames, options if len(filenames) > 1 else options._replace(jobs=1))
+    out.flush()
+    if options.resultCache:
+      options.resultCache.trim()
+
+  try:
+    watch.watch(paths, excludeGlobs, checkFiles)
+  except KeyboardInterrupt:
+    pass
+
+
+def hasErrors(filenames, options):
+  """Whether any of the given paths has an error or unparsed text.
+
+  Checks the line lengths of every file, without building the grammar, before parsing any, and stops at the first
+  error found.
+  """
+  from ocstyle import parsing, suppression
+  from ocstyle.lines import LineIndex
+  filenames = [filename for filename in filenames if not os.path.isdir(filename)]
   for filename in filenames:
-    if not os.path.isdir(filename):
-      print filename
-      for part in check(filename, args.maxLineLength):
-        if isinstance(part, rules.Error):
-          print 'ERROR: %s' % part
-        else:
-          print 'unparsed: %r' % part
-    print
+    with open(filename) as f:
+      content = f.read()
+    lineErrors = parsing.longLineErrors(LineIndex(content, parsing.TAB_SIZE), options.maxLineLength,
+                                        suppression.scan(content))
+    if options.baseline:
+      lineErrors = list(options.baseline.filter(filename, lineErrors))
+    if lineErrors:
+      return True
+
+  results = _mapFiles(functools.partial(check, options=options._replace(maxErrors=1)), filenames, options.jobs)
+  try:
+    return any(results)
+  finally:
+    results.close()
+
+
+def writeStdinReport(out, filename, stdin, options):
+  """Style checks the content of stdin as if it were the given path, and writes the report to out."""
+  parts = checkFile(filename, stdin, options._replace(splitJobs=1))
+  if options.outputFormat == 'text':
+    out.write(formatReport(filename, parts))
+  else:
+    writeRecords(formats.WRITERS[options.outputFormat](out), [(filename, records(parts))])
+
+
+def writeBaseline(path, filenames, options):
+  """Style checks the given paths and writes a baseline of everything found to path."""
+  from ocstyle import baseline
+  filenames = (filename for filename in filenames if not os.path.isdir(filename))
+  baseline.write(path, itertools.chain.from_iterable(
+      _mapFiles(functools.partial(checkFingerprints, options=options), filenames, options.jobs)))
+
+
+def writeRecords(writer, fileRecords):
+  """Writes (path, records) for each file as the whole report with the given formats.Writer.  The records of each file
+  are written in formats.recordOrder, whichever way they were found."""
+  writer.begin()
+  for filename, recordsForFile in fileRecords:
+    writer.beginFile(filename)
+    for record in sorted(recordsForFile, key=formats.recordOrder):
+      writer.write(filename, record)
+    writer.endFile(filename)
+  writer.end()
+
+
+def run(argv, out, err, stdin):
+  """Runs the command line with the given arguments, writing to the given streams.  Returns the exit status."""
+  if not client.needsCheck(argv):
+    return 0
+
+  import argparse
+  parser = argparse.ArgumentParser(prog='ocstyle')
+  parser.add_argument("--maxLineLength", action="store", type=int, default=120, help="Maximum line length")
+  parser.add_argument("--jobs", "-j", action="store", type=int, default=1,
+                      help="Number of files to check in parallel, 0 to use all cores")
+  parser.add_argument("--split-jobs", dest="splitJobs", action="store", type=int, default=1,
+                      help="Number of processes to parse each large file on in parts, 0 to use all cores, when "
+                           "checking one file at a time")
+  parser.add_argument("--max-errors", dest="maxErrors", action="store", type=int, default=0,
+                      help="Stop checking once this many errors are found, 0 for no limit")
+  parser.add_argument("--quiet-exit", dest="quietExit", action="store_true",
+                      help="Print nothing, stop at the first error, and exit with status 1 if there was one")
+  parser.add_argument("--baseline", action="store", metavar="FILE",
+                      help="Only report errors that are not in this baseline")
+  parser.add_argument("--write-baseline", dest="writeBaseline", action="store", metavar="FILE",
+                      help="Write a baseline of every error found to this file instead of reporting them")
+  parser.add_argument("--fix", action="store_true",
+                      help="Rewrite files with the fixes for spacing, newline and semicolon errors, and report only "
+                           "the errors left")
+  parser.add_argument("--watch", action="store_true",
+                      help="Check the files in the given paths as with --recursive, and then check each file again "
+                           "whenever it changes, until interrupted")
+  parser.add_argument("--cache", action="store_true", help="Cache results for unchanged files")
+  parser.add_argument("--cache-dir", dest="cacheDir", action="store", help="Directory to cache results in")
+  parser.add_argument("--cache-size", dest="cacheSize", action="store", type=int,
+                      default=cache.DEFAULT_MAX_BYTES / 1024 / 1024, help="Maximum size of the cache in megabytes")
+  parser.add_argument("--packrat", dest="memoEntries", action="store", type=int, default=0,
+                      help="Memoize up to this many parse results per file, 0 to disable")
+  parser.add_argument("--format", dest="outputFormat", action="store", default="text",
+                      choices=["text"] + sorted(formats.WRITERS), help="Report format")
+  parser.add_argument("--recursive", "-r", action="store_true",
+                      help="Check the .h, .m and .mm files in directories, except those ignored by .gitignore or "
+                           ".ocstyleignore files")
+  parser.add_argument("--exclude", dest="excludes", action="append", default=[], metavar="GLOB",
+                      help="Skip paths, and files and directories in directories, that match this glob")
+  parser.add_argument("--stdin-filename", dest="stdinFilename", action="store",
+                      help="Check stdin instead of the given files, reporting it as this path")
+  parser.add_argument("--profile", action="store_true", help="Print time spent in each rule to stderr")
+  parser.add_argument("--profile-json", dest="profileJson", action="store",
+                      help="Write time spent in each rule to this file as JSON")
+  parser.add_argument("--daemon", action="store_true", help="Serve checks for ocstyle-client until idle")
+  parser.add_argument("--socket", dest="socketPath", action="store", default=client.defaultSocketPath(),
+                      help="Unix socket for the daemon")
+  parser.add_argument("--idle-timeout", dest="idleTimeout", action="store", type=float,
+                      default=client.DEFAULT_IDLE_TIMEOUT, help="Seconds the daemon waits for a check before exiting")
+  args, filenames = parser.parse_known_args(argv)
+
+  if args.daemon:
+    from ocstyle import daemon # Imports this module.
+    daemon.Daemon(args.socketPath, args.idleTimeout).serve()
+    return 0
+
+
+  if args.writeBaseline and args.stdinFilename:
+    parser.error('--write-baseline checks files, not stdin')
+  if args.fix and (args.stdinFilename or args.writeBaseline or args.maxErrors or args.quietExit):
+    parser.error('--fix can not be used with --stdin-filename, --write-baseline, --max-errors or --quiet-exit')
+  if args.watch and (args.stdinFilename or args.writeBaseline or args.maxErrors or args.quietExit or args.fix):
+    parser.error('--watch can not be used with --stdin-filename, --write-baseline, --max-errors, --quiet-exit or --fix')
+  if (args.maxErrors or args.quietExit) and (args.cache or args.cacheDir or args.splitJobs != 1):
+    parser.error('--max-errors and --quiet-exit stop checking early, so can not be used with --cache, --cache-dir or '
+                 '--split-jobs')
+  knownErrors = None
+  if args.baseline:
+    from ocstyle import baseline
+    try:
+      knownErrors = baseline.Baseline(args.baseline)
+    except (IOError, ValueError) as e:
+      parser.error('can not read baseline: %s' % e)
+
+  ruleProfiler = None
+  if args.profile or args.profileJson:
+    from ocstyle import profiler
+    ruleProfiler = profiler.RuleProfiler()
+    ruleProfiler.install()
+  options = Options(
+      maxLineLength=args.maxLineLength,
+      jobs=1 if ruleProfiler else args.jobs, # Workers would not report back, so profile serially.
+      resultCache=cache.ResultCache(args.cacheDir, args.cacheSize * 1024 * 1024)
+      if args.cache or args.cacheDir or args.watch else None,
+      memoEntries=args.memoEntries,
+      splitJobs=1 if ruleProfiler else args.splitJobs,
+      baseline=knownErrors,
+      fix=args.fix,
+      outputFormat=args.outputFormat,
+      maxErrors=1 if args.quietExit else args.maxErrors)
+  status = 0
+  try:
+    if not args.stdinFilename and not args.watch:
+      filenames = discovery.discover(filenames, args.recursive, args.excludes)
+    if args.writeBaseline:
+      writeBaseline(args.writeBaseline, filenames, options._replace(baseline=None))
+    elif args.quietExit:
+      if args.stdinFilename:
+        found = checkFile(args.stdinFilename, stdin, options)
+      else:
+        found = hasErrors(filenames, options)
+      status = 1 if found else 0
+    elif args.stdinFilename:
+      writeStdinReport(out, args.stdinFilename, stdin, options)
+    elif args.watch:
+      watchReport(out, filenames, args.excludes, options)
+    else:
+      writeReport(out, filenames, options)
+  finally:
+    if ruleProfiler:
+      ruleProfiler.uninstall()
+    if options.resultCache:
+      options.resultCache.trim()
+
+  if args.profile:
+    ruleProfiler.writeTable(err)
+  if args.profileJson:
+    with open(args.profileJson, 'w') as profileOut:
+      ruleProfiler.writeJson(profileOut)
+  return status
+
+
+def main():
+  """Main body of the script."""
+  sys.exit(run(sys.argv[1:], sys.stdout, sys.stderr, sys.stdin))
 
 
 if __name__ == '__main__':
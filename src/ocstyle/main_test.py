@@ -14,11 +14,17 @@
 
 """Tests for the Objective C style checker."""
 
+import json
 import os.path
+import StringIO
 import pkg_resources
+import shutil
+import sys
+import tempfile
+import threading
 import unittest
 
-from ocstyle import main
+from ocstyle import main, parsing
 
 
 
@@ -71,10 +77,10 @@ class StyleCheckerTest(unittest.TestCase):
       errors = []
       badParse = []
       with pkg_resources.resource_stream('ocstyle', os.path.join('testdata', filename)) as f:
-        result = main.checkFile(filename, f, 120)
+        result = main.checkFile(filename, f)
       for part in result:
-        if isinstance(part, basestring):
-          badParse.append(part)
+        if isinstance(part, main.Span):
+          badParse.append(part.text())
         else:
           errors.append((part.kind, part.lineAndOffset()[0]))
 
@@ -101,3 +107,153 @@ class StyleCheckerTest(unittest.TestCase):
           lineNumber += 1
 
       self.assertSameErrors(expected, errors)
+
+
+  def testParallelMatchesSerial(self):
+    """Checking with a pool of workers reports the same output, in the same order, as checking serially."""
+    filenames = [pkg_resources.resource_filename('ocstyle', os.path.join('testdata', filename))
+                 for filename in ('Parsing.h', 'Parsing.m', 'Parsing.h')]
+    serial = list(main.checkAll(filenames))
+    parallel = list(main.checkAll(filenames, main.Options(jobs=2)))
+    self.assertEquals(serial, parallel)
+
+
+  def testRecordOrderMatches(self):
+    """Records are written in the same order whether files are cached, split, limited or checked in parallel."""
+    directory = tempfile.mkdtemp()
+    try:
+      path = os.path.join(directory, 'a.m')
+      with open(path, 'w') as f:
+        f.write('@interface a\n@end\n%%%\n- (void)b;\n{\n    if(x) {\n    }\n}\n' + 'x' * 130 + '\n@end\n')
+
+      def report(*flags):
+        """The jsonl report for the file with the given extra flags."""
+        out = StringIO.StringIO()
+        main.run(['--format', 'jsonl'] + list(flags) + [path], out, None, None)
+        return out.getvalue()
+
+      expected = report()
+      found = [json.loads(line) for line in expected.splitlines()]
+      self.assertIn('Unparsed', [record['kind'] for record in found])
+      self.assertEquals(sorted(found, key=lambda record: (record['position'], record['kind'])), found)
+      for flags in (['--cache-dir', os.path.join(directory, 'cache')], ['--split-jobs', '2'], ['--max-errors', '1000'],
+                    ['--jobs', '2']):
+        self.assertEquals(expected, report(*flags))
+      self.assertEquals(expected, report('--cache-dir', os.path.join(directory, 'cache')))
+    finally:
+      shutil.rmtree(directory)
+
+
+  def testPackratMatches(self):
+    """Memoizing parse results does not change the reported errors, even when the memo table overflows."""
+    for filename in ('Parsing.h', 'Parsing.m'):
+      path = pkg_resources.resource_filename('ocstyle', os.path.join('testdata', filename))
+      expected = [str(part) for part in main.check(path)]
+      self.assertEquals(expected, [str(part) for part in main.check(path, main.Options(memoEntries=1000000))])
+      self.assertEquals(expected, [str(part) for part in main.check(path, main.Options(memoEntries=50))])
+
+
+  def testThreadSafe(self):
+    """Checks running at the same time on several threads do not interfere with each other."""
+    paths = [pkg_resources.resource_filename('ocstyle', os.path.join('testdata', filename))
+             for filename in ('Parsing.h', 'Parsing.m')]
+    expected = dict((path, [str(part) for part in main.check(path)]) for path in paths)
+    results = []
+
+    def checkRepeatedly(path):
+      """Check the same file several times."""
+      for _ in range(3):
+        results.append((path, [str(part) for part in main.check(path)]))
+
+    threads = [threading.Thread(target=checkRepeatedly, args=(paths[i % 2],)) for i in range(6)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertEquals(18, len(results))
+    for path, result in results:
+      self.assertEquals(expected[path], result)
+
+
+  def testIterCheck(self):
+    """Streamed errors are the same as the checked errors, and start before the whole file is parsed."""
+    paths = [pkg_resources.resource_filename('ocstyle', os.path.join('testdata', filename))
+             for filename in ('Parsing.h', 'Parsing.m')]
+    for path in paths:
+      streamed = [part for streamedPath, part in main.iterCheck([path]) if streamedPath == path]
+      streamed.sort(key=lambda err: err.position if isinstance(err, main.Error) else 0)
+      self.assertEquals([str(part) for part in main.check(path)], [str(part) for part in streamed])
+
+    content = '- (void)a;\n{\n    if(x) {\n    }\n}\n\n' + '@interface A\n@end\n' * 1000
+    filePart = parsing.grammar(False).filePart
+    parse = filePart.parse
+    positions = []
+    filePart.parse = lambda text, position, end, space: positions.append(position) or parse(text, position, end, space)
+    try:
+      stream = main.iterCheckFile('a.m', StringIO.StringIO(content))
+      self.assertEquals('MissingSpace', next(stream).kind)
+      self.assertTrue(max(positions) < 100) # Only the method has been parsed.
+      list(stream)
+      self.assertTrue(max(positions) > len(content) - 100)
+    finally:
+      del filePart.parse
+
+
+  def testLocated(self):
+    """Report lines and records found with one pass over the lines match looking up each part on its own."""
+    path = pkg_resources.resource_filename('ocstyle', os.path.join('testdata', 'Parsing.m'))
+    parts = main.check(path)
+    for ordered in (parts, parts[::-1], (part for _, part in main.iterCheck([path]))):
+      ordered = list(ordered)
+      self.assertEquals([str(part) for part in ordered if isinstance(part, main.Error)],
+                        [line[len('ERROR: '):] for line in main.formatLines(iter(ordered)) if line.startswith('ERROR')])
+      self.assertEquals([part.lineAndColumn() for part in ordered], [record[:2] for record in main.records(ordered)])
+
+
+  def testNoObjectiveC(self):
+    """Nothing is checked or reported when no Objective C file is given."""
+    out = StringIO.StringIO()
+    self.assertEquals(0, main.run(['README.md', 'setup.py'], out, None, None))
+    self.assertEquals('', out.getvalue())
+
+
+  def testMaxErrors(self):
+    """Checking stops once enough errors are found, finding line errors before parsing."""
+    path = pkg_resources.resource_filename('ocstyle', os.path.join('testdata', 'Parsing.m'))
+    allErrors = [str(part) for part in main.check(path)]
+    found = [str(part) for part in main.check(path, main.Options(maxErrors=3))]
+    self.assertEquals(3, len(found))
+    self.assertEquals(sorted(found, key=allErrors.index), found)
+    self.assertEquals(allErrors, [str(part) for part in main.check(path, main.Options(maxErrors=len(allErrors) + 1))])
+
+    content = '- (void)a;\n{\n    if(x) {\n    }\n}\n\n' + '@interface A\n@end\n' * 1000 + 'x' * 130 + '\n'
+    found = main.checkFile('a.m', StringIO.StringIO(content), main.Options(maxErrors=1))
+    self.assertEquals(['LineTooLong'], [err.kind for err in found])
+
+    for jobs in (1, 2):
+      out = StringIO.StringIO()
+      main.writeReport(out, [path, path], main.Options(jobs=jobs, maxErrors=2))
+      self.assertEquals(path, out.getvalue().split('\n')[0])
+      self.assertEquals(4, len(out.getvalue().splitlines()))
+
+
+  def testMaxErrorsRejectsCacheAndSplit(self):
+    """Options that need whole results can not be used with a limit."""
+    for flags in (['--max-errors', '1', '--cache'], ['--quiet-exit', '--split-jobs', '2']):
+      stderr = sys.stderr
+      sys.stderr = StringIO.StringIO()
+      try:
+        self.assertRaises(SystemExit, main.run, flags + ['a.m'], StringIO.StringIO(), None, None)
+      finally:
+        sys.stderr = stderr
+
+
+  def testQuietExit(self):
+    """A quiet check reports whether there were errors with its exit status alone."""
+    path = pkg_resources.resource_filename('ocstyle', os.path.join('testdata', 'Parsing.m'))
+    out = StringIO.StringIO()
+    self.assertEquals(1, main.run(['--quiet-exit', path], out, None, None))
+    self.assertEquals(0, main.run(['--quiet-exit', '--stdin-filename', 'a.m'], out, None,
+                                  StringIO.StringIO('@implementation A\n@end\n')))
+    self.assertEquals('', out.getvalue())
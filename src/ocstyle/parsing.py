@@ -0,0 +1,446 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parsing machinery shared by every variant of the grammar: the check context, the memo table, and parser types.
+
+ocstyle.rules.build makes the grammar for header files, or without the checks that only apply to headers for
+implementation files.  Both variants use the classes and thread state here, so either can run in any context.
+"""
+
+import bisect
+import re
+import threading
+
+import parcon
+from parcon import Literal, Regex, Translate
+from parcon import failure, match, ERegex, EUnsatisfiable
+
+from ocstyle import suppression
+from ocstyle.error import Error
+from ocstyle.lexer import PUNCTUATION, TOKEN
+from ocstyle.lines import TAB_SIZE, LineIndex
+
+
+NESTING_LIMIT = 16
+
+BRACKETS = {'(': 1, '[': 1, '{': 1, ')': -1, ']': -1, '}': -1}
+
+SPACES = re.compile(r'[ \t]*')
+
+_GRAMMARS = {}
+
+_GRAMMARS_LOCK = threading.Lock()
+
+
+def grammar(header):
+  """The rules for header files, or for implementation files if header is False, as an ocstyle.rules.Grammar.
+
+  Each variant is built once per process, the first time it is needed.
+  """
+  with _GRAMMARS_LOCK:
+    rules = _GRAMMARS.get(header)
+    if rules is None:
+      from ocstyle.rules import build
+      rules = _GRAMMARS[header] = build(header)
+    return rules
+
+
+
+class _ThreadState(threading.local):
+  """The checks in progress on a thread."""
+
+  def __init__(self):
+    threading.local.__init__(self)
+    self.context = None
+    self.previous = []
+
+
+_STATE = _ThreadState()
+
+
+def currentContext():
+  """The CheckContext of the check in progress on this thread, or None."""
+  return _STATE.context
+
+
+
+class CheckContext(object):
+  """The state of a single style check: line data, options, the grammar for the type of file, and the parse memo table.
+
+  Parse inside a with statement on the context so that rule callbacks can find it.  Contexts can be nested, and each
+  thread has its own current context, so any number of checks can run in one process.
+  """
+
+  def __init__(self, content, maxLineLength=120, memoEntries=0, header=True):
+    self.content = content
+    self.lines = LineIndex(content, TAB_SIZE)
+    self.maxLineLength = maxLineLength
+    self.memo = Memo(memoEntries) if memoEntries else None
+    self.header = header
+    self.rules = grammar(header)
+    self.reach = None
+    self.nested = {}
+    self.nesting = 0
+    self.filling = set()
+    self.brackets = None
+    self._suppressions = None
+
+
+  def __enter__(self):
+    _STATE.previous.append(_STATE.context)
+    _STATE.context = self
+    return self
+
+
+  def __exit__(self, *_):
+    _STATE.context = _STATE.previous.pop()
+
+
+  def edit(self, position, removedLength, text):
+    """Replaces removedLength characters at position with text, updating the line index in place."""
+    self.lines.edit(position, removedLength, text)
+    self.content = self.lines.content
+    self.nested = {}
+    self.brackets = None
+    self._suppressions = None
+
+
+  def suppressions(self):
+    """The errors turned off by comments in the file."""
+    if self._suppressions is None:
+      self._suppressions = suppression.scan(self.content)
+    return self._suppressions
+
+
+  def lineErrors(self):
+    """Check line lengths."""
+    return longLineErrors(self.lines, self.maxLineLength, self.suppressions())
+
+
+def longLineErrors(lines, maxLineLength, suppressions):
+  """The errors for the lines of the given LineIndex longer than maxLineLength, except those turned off by the given
+  suppression.Suppressions.  Needs no grammar."""
+  return suppressions.filter([
+      Error('LineTooLong', 'Line too long: %d chars over the %d limit' % (lineLength, maxLineLength), position, lines)
+      for position, lineLength in lines.longLines(maxLineLength)])
+
+
+def error(kind, message, position, edit=None):
+  """Creates an error in the check in progress, with the (start, end, replacement) edit that fixes it if any."""
+  context = _STATE.context
+  return Error(kind, message, position, context.lines if context else None, edit)
+
+
+
+def furthestExpected(expected):
+  """The expectations from the given ones that parcon reports a failure with: those at the furthest position, and
+  separately the unsatisfiable ones it only reports when there are no others."""
+  furthest = {}
+  for position, expectation in expected:
+    unsatisfiable = isinstance(expectation, EUnsatisfiable)
+    if position > furthest.get(unsatisfiable, -1):
+      furthest[unsatisfiable] = position
+  return [(position, expectation) for position, expectation in expected
+          if position == furthest[isinstance(expectation, EUnsatisfiable)]]
+
+
+
+class Reach(object):
+  """How far into the text a parse looked, recorded by the rules while an incremental check tracks it.
+
+  Parse results only show where parsers matched or failed, so LOOKAHEAD covers the characters looked at past those.
+  A regex can also fail after scanning to the end of the text for its closing delimiter, so failed regexes are tried
+  again with closing delimiters appended: one that then matches looked at the whole text.
+  """
+
+  LOOKAHEAD = 16
+
+  CLOSERS = '\n"" */>];'
+
+  SPACE = re.compile(r'\s*')
+
+
+  def __init__(self, text):
+    self.text = text
+    self.position = 0
+    self._padded = None
+    self._regexReaches = {}
+
+
+  def add(self, result):
+    """Records the positions the given parse result shows were looked at."""
+    position = self.position
+    if result and result.end > position:
+      position = result.end
+    for expectedPosition, expectation in result.expected:
+      if isinstance(expectation, ERegex):
+        expectedPosition = self._regexReach(expectedPosition, expectation.pattern_text)
+      if expectedPosition > position:
+        position = expectedPosition
+    self.position = position
+
+
+  def _regexReach(self, position, pattern):
+    """How far a regex that failed at the position may have looked."""
+    key = (position, pattern)
+    reach = self._regexReaches.get(key)
+    if reach is None:
+      if self._padded is None:
+        self._padded = self.text + self.CLOSERS
+      if re.compile(pattern).match(self._padded, position):
+        reach = len(self.text) + 1
+      else: # Scanning stopped before the end, at worst after the spaces a pattern like [^;]*[^;\s] fails on.
+        reach = self.SPACE.match(self.text, position).end()
+      self._regexReaches[key] = reach
+    return reach
+
+
+
+class Memo(object):
+  """Packrat memo table of parse results, keyed by parser and position.
+
+  Holds the results for a single text, so it must be replaced for each file.  When it grows to maxEntries it is
+  emptied; parsing moves forward through the file, so the entries it loses are rarely needed again.
+  """
+
+  def __init__(self, maxEntries):
+    self.maxEntries = maxEntries
+    self.entries = 0
+    self.tables = {}
+
+
+  def parse(self, parser, parse, text, position, endPosition, space):
+    """Returns the memoized result of parse, calling it if there is none yet."""
+    table = self.tables.get(parser)
+    if table is None:
+      table = self.tables[parser] = {}
+    result = table.get(position)
+    if result is None:
+      if self.entries >= self.maxEntries:
+        for other in self.tables.itervalues():
+          other.clear()
+        self.entries = 0
+      result = table[position] = parse(text, position, endPosition, space)
+      self.entries += 1
+    return result
+
+
+
+class TranslateWithPosition(Translate):
+  """Like Translate, but also passes the end position, and the start position before it to functions taking three
+  arguments."""
+
+  def __init__(self, parser, function, passPosition=None):
+    Translate.__init__(self, parser, function)
+    argCount = function.func_code.co_argcount if passPosition is None else 0
+    self._passPosition = argCount >= 2 if passPosition is None else passPosition
+    self._passStart = argCount == 3
+    self._memoize = not isinstance(parser, (Regex, Literal, SpaceRun)) # Matching these again is as cheap as a lookup.
+
+
+  def parse(self, text, position, endPosition, space):
+    memo = _STATE.context and _STATE.context.memo
+    if memo is not None and self._memoize:
+      return memo.parse(self, self.parseUnmemoized, text, position, endPosition, space)
+    return self.parseUnmemoized(text, position, endPosition, space)
+
+
+  def parseUnmemoized(self, text, position, endPosition, space):
+    """Parses without consulting the memo table."""
+    result = self.parser.parse(text, position, endPosition, space)
+    reach = _STATE.context and _STATE.context.reach
+    if reach is not None:
+      reach.add(result)
+    if not result:
+      return failure(result.expected)
+    if self._passStart:
+      translated = self.function(result.value, position, result.end)
+    elif self._passPosition:
+      translated = self.function(result.value, result.end)
+    else:
+      translated = self.function(result.value)
+    return match(result.end, translated, result.expected)
+
+
+class Forward(parcon.Forward):
+  """Like Forward, but consults the memo table."""
+
+  def parse(self, text, position, endPosition, space):
+    memo = _STATE.context and _STATE.context.memo
+    if memo is not None:
+      return memo.parse(self, self.parseUnmemoized, text, position, endPosition, space)
+    return self.parser.parse(text, position, endPosition, space)
+
+
+  def parseUnmemoized(self, text, position, endPosition, space):
+    """Parses without consulting the memo table."""
+    return self.parser.parse(text, position, endPosition, space)
+
+
+
+class Nested(Forward):
+  """Like Forward, for a rule that nests inside brackets, such as a code block, without the stack growing with the
+  nesting.
+
+  Each level of nesting takes several Python stack frames.  Once rules are nested NESTING_LIMIT deep, the rule is parsed
+  at each opening bracket of its kind nested inside the one being parsed, innermost first, using brackets matched once
+  for the whole text.  Parsing the outer levels then finds the inner ones already parsed.  The rule is parsed
+  offset characters after its opening bracket.
+
+  The result at each position is kept for the rest of the check, so a rule that backtracks over a nested block, such as
+  a statement trying each of its alternatives, does not parse the block again, which is exponential in the nesting.
+  """
+
+  def __init__(self, opening, offset=0):
+    Forward.__init__(self)
+    self.opening = opening
+    self.offset = offset
+
+
+  def parse(self, text, position, endPosition, space):
+    context = _STATE.context
+    if context is None or context.content is not text:
+      return Forward.parse(self, text, position, endPosition, space)
+    found = context.nested.get((self, position))
+    if found is None:
+      context.nesting += 1
+      try:
+        if context.nesting >= NESTING_LIMIT and self not in context.filling:
+          self._parseInside(context, text, position, endPosition, space)
+        found = self._parseAndRecord(context, text, position, endPosition, space)
+      finally:
+        context.nesting -= 1
+    result, reach = found
+    if context.reach is not None and reach > context.reach.position:
+      context.reach.position = reach
+    return result
+
+
+  def _parseAndRecord(self, context, text, position, endPosition, space):
+    """Parses at position, and records the result with how far the parse looked."""
+    reach = context.reach
+    if reach is None:
+      found = (Forward.parse(self, text, position, endPosition, space), 0)
+    else:
+      outer = reach.position
+      reach.position = position
+      result = Forward.parse(self, text, position, endPosition, space)
+      reach.add(result)
+      found = (result, reach.position)
+      reach.position = outer
+    result, reach = found
+    if len(result.expected) > 1: # Each level would otherwise carry every inner level's expectations.
+      found = (parcon.Result(result.end, result.value, furthestExpected(result.expected)), reach)
+    context.nested[(self, position)] = found
+    return found
+
+
+  def _parseInside(self, context, text, position, endPosition, space):
+    """Parses the rule at each of its opening brackets nested inside the brackets at position, innermost first."""
+    if context.brackets is None:
+      context.brackets = Brackets(text)
+    starts = [start + self.offset for start in context.brackets.inside(self.opening, position, endPosition)
+              if start + self.offset != position]
+
+    context.filling.add(self)
+    try:
+      for start in reversed(starts):
+        if (self, start) not in context.nested:
+          self._parseAndRecord(context, text, start, endPosition, space)
+    finally:
+      context.filling.discard(self)
+
+
+
+class Brackets(object):
+  """The brackets in a text, matched once so that finding the brackets nested at a position does not scan to the end
+  of the text at each level of unbalanced nesting."""
+
+  def __init__(self, text):
+    self.positions = []
+    self.openings = {}
+    self.ends = [] # The index of the bracket that closes each bracket, itself for a closing one.
+    unclosed = []
+    for m in TOKEN.finditer(text):
+      if m.lastindex == PUNCTUATION and m.group() in BRACKETS:
+        index = len(self.positions)
+        self.positions.append(m.start())
+        self.ends.append(index)
+        if BRACKETS[m.group()] > 0:
+          self.openings.setdefault(m.group(), []).append(m.start())
+          unclosed.append(index)
+        elif unclosed:
+          self.ends[unclosed.pop()] = index
+    for index in unclosed:
+      self.ends[index] = len(self.positions)
+    self.ends.append(len(self.positions))
+
+
+  def inside(self, opening, position, endPosition):
+    """The positions of the given opening bracket from position to the end of the first brackets after it."""
+    end = self.ends[bisect.bisect_left(self.positions, position)]
+    if end < len(self.positions):
+      endPosition = min(endPosition, self.positions[end])
+    openings = self.openings.get(opening, [])
+    return openings[bisect.bisect_left(openings, position):bisect.bisect_left(openings, endPosition)]
+
+
+
+class NoSpace(parcon.Parser):
+  """A whitespace parser that never matches, like parcon's Invalid, but without the cost of trying."""
+
+  def parse(self, text, position, endPosition, space):
+    return failure([(position, EUnsatisfiable())])
+
+
+  def consume(self, text, position, endPosition):
+    return position
+
+
+  def __repr__(self):
+    return 'NoSpace()'
+
+
+NO_SPACE = NoSpace()
+
+
+
+class SpaceRun(parcon.Parser):
+  """Matches a run of at least minimum spaces and tabs."""
+
+  def __init__(self, minimum=0):
+    self.minimum = minimum
+
+
+  def parse(self, text, position, endPosition, space):
+    position = space.consume(text, position, endPosition)
+    runEnd = SPACES.match(text, position, endPosition).end()
+    if runEnd - position < self.minimum:
+      return failure([(position, ERegex(r'[ \t]+'))])
+    return match(runEnd, text[position:runEnd], [(runEnd, EUnsatisfiable())])
+
+
+  def __repr__(self):
+    return 'SpaceRun(%d)' % self.minimum
+
+
+
+def rule(parserPart):
+  """Decorator for rule syntax."""
+
+  def decorator(f):
+    """The actual decorator."""
+    return TranslateWithPosition(parserPart, f)
+
+  return decorator
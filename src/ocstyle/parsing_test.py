@@ -0,0 +1,77 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the grammar variants."""
+
+import unittest
+
+import parcon
+
+from ocstyle import parsing, rules
+
+
+
+class GrammarTest(unittest.TestCase):
+  """Tests for the header and implementation grammars."""
+
+  def kinds(self, content, header):
+    """The kinds of error found parsing the content with the given grammar."""
+    context = parsing.CheckContext(content, header=header)
+    with context:
+      return [err.kind for err in parcon.Exact(context.rules.entireFile, parsing.NO_SPACE).parse_string(content)]
+
+
+  def testVariants(self):
+    """Each variant is built once, and they share the rules that do not differ."""
+    self.assertTrue(parsing.grammar(False) is parsing.grammar(False))
+    self.assertTrue(parsing.grammar(True).header)
+    self.assertFalse(parsing.grammar(False).header)
+    self.assertTrue(parsing.grammar(False).codeBlock is rules.codeBlock)
+    self.assertFalse(parsing.grammar(False).interface is parsing.grammar(True).interface)
+    self.assertTrue(rules.DEFAULT.interface is parsing.grammar(True).interface)
+    self.assertTrue(rules.DEFAULT.header)
+
+
+  def testHeaderChecks(self):
+    """Implementation files are not checked for what only headers need."""
+    content = '@interface A\n\n- (void)_private;\n\n@property int Count;\n\n@end\n'
+    self.assertEquals(['ExpectedInterfaceDocInHeader', 'PrivateSelectorInHeader', 'ExpectedPropertyDocInHeader',
+                       'BadPropertyName'], self.kinds(content, True))
+    self.assertEquals(['BadPropertyName'], self.kinds(content, False))
+    self.assertEquals(['BadPropertyName'], self.kinds('/** A */\n' + content.replace('@p', '/** C */\n@p'), False))
+
+
+
+class NestedTest(unittest.TestCase):
+  """Tests for rules nested deeper than the recursion limit."""
+
+  def testBracketsInside(self):
+    """The brackets inside the first ones from a position are found, up to the end of unclosed ones."""
+    text = 'a { b ( c ) { d } } e { f { g'
+    brackets = parsing.Brackets(text)
+    self.assertEquals([2, 12], brackets.inside('{', 0, len(text)))
+    self.assertEquals([], brackets.inside('{', 3, len(text)))
+    self.assertEquals([6], brackets.inside('(', 3, len(text)))
+    self.assertEquals([22, 26], brackets.inside('{', 20, len(text)))
+    self.assertEquals([22], brackets.inside('{', 20, 24))
+
+
+  def testUnbalancedNesting(self):
+    """Results kept for unclosed blocks do not carry what every block inside them expected, which is quadratic."""
+    content = '- (void)foo;\n{\n' + '{' * 300 + 'x;\n'
+    context = parsing.CheckContext(content, header=False)
+    with context:
+      parcon.Exact(context.rules.entireFile, parsing.NO_SPACE).parse_string(content)
+    self.assertTrue(len(context.nested) > 300)
+    self.assertTrue(max(len(result.expected) for result, _ in context.nested.values()) < 50)
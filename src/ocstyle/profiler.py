@@ -0,0 +1,158 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per rule profiling of the style checker grammar."""
+
+import json
+import timeit
+
+from ocstyle import parsing
+
+
+COLUMNS = ('calls', 'successes', 'failures', 'reattempts', 'inclusive', 'exclusive')
+
+
+def namedRules():
+  """Yields (name, parser) for each named rule and forward declaration in the header and implementation grammars.
+
+  A rule has the same name in both, so its stats are combined.
+  """
+  seen = set()
+  for header in (True, False):
+    for name, value in sorted(vars(parsing.grammar(header)).items()):
+      if isinstance(value, (parsing.TranslateWithPosition, parsing.Forward)) and id(value) not in seen:
+        seen.add(id(value))
+        yield name, value
+
+
+
+class RuleStats(object):
+  """Counts and times for a single rule.
+
+  Inclusive time counts the outermost call of a recursive rule only; exclusive time excludes the time spent in other
+  profiled rules.
+  """
+
+  __slots__ = COLUMNS + ('active',)
+
+
+  def __init__(self):
+    self.calls = self.successes = self.failures = self.reattempts = self.active = 0
+    self.inclusive = self.exclusive = 0.0
+
+
+  def asDict(self):
+    """The stats as a dictionary."""
+    return dict((column, getattr(self, column)) for column in COLUMNS)
+
+
+
+class RuleProfiler(object):
+  """Profiles each named rule while installed.
+
+  Installing replaces the parse method of each rule instance, and uninstalling removes the replacements again, so the
+  grammar runs unchanged when no profiler is installed.  Profile one thread at a time.
+  """
+
+  def __init__(self):
+    self.stats = {}
+    self._installed = []
+    self._children = []
+    self._text = None
+    self._positions = {}
+
+
+  def __enter__(self):
+    self.install()
+    return self
+
+
+  def __exit__(self, *_):
+    self.uninstall()
+
+
+  def install(self):
+    """Start profiling the grammar."""
+    for name, parser in namedRules():
+      parser.parse = self._wrap(name, parser.parse)
+      self._installed.append(parser)
+
+
+  def uninstall(self):
+    """Stop profiling the grammar."""
+    for parser in self._installed:
+      del parser.parse
+    self._installed = []
+
+
+  def _wrap(self, name, parse):
+    """Wraps the given parse method to record stats for the named rule."""
+    stats = self.stats.setdefault(name, RuleStats())
+    children = self._children
+    timer = timeit.default_timer
+
+    def profiled(text, position, endPosition, space):
+      """Parses and records the result."""
+      if text is not self._text:
+        self._text = text
+        self._positions = {}
+      positions = self._positions.setdefault(name, set())
+      if position in positions:
+        stats.reattempts += 1
+      else:
+        positions.add(position)
+
+      stats.calls += 1
+      stats.active += 1
+      children.append(0.0)
+      start = timer()
+      try:
+        result = parse(text, position, endPosition, space)
+      finally:
+        elapsed = timer() - start
+        childTime = children.pop()
+        stats.active -= 1
+      if children:
+        children[-1] += elapsed
+      stats.exclusive += elapsed - childTime
+      if not stats.active:
+        stats.inclusive += elapsed
+      if result:
+        stats.successes += 1
+      else:
+        stats.failures += 1
+      return result
+
+    return profiled
+
+
+  def sortedStats(self):
+    """(name, stats) for each rule that was called, most exclusive time first."""
+    return sorted([item for item in self.stats.items() if item[1].calls],
+                  key=lambda item: (-item[1].exclusive, item[0]))
+
+
+  def writeTable(self, out):
+    """Writes the stats as a text table."""
+    out.write('%-28s %10s %10s %10s %10s %12s %12s\n' % (('rule',) + COLUMNS))
+    for name, stats in self.sortedStats():
+      out.write('%-28s %10d %10d %10d %10d %12.6f %12.6f\n' % (
+          name, stats.calls, stats.successes, stats.failures, stats.reattempts, stats.inclusive, stats.exclusive))
+
+
+  def writeJson(self, out):
+    """Writes the stats as a JSON object keyed by rule name."""
+    json.dump(dict((name, stats.asDict()) for name, stats in self.sortedStats()), out,
+              indent=2, separators=(',', ': '), sort_keys=True)
+    out.write('\n')
@@ -0,0 +1,47 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for per rule profiling."""
+
+import StringIO
+import json
+import unittest
+
+from ocstyle import parsing, profiler
+from ocstyle.main import checkFile
+
+
+
+class RuleProfilerTest(unittest.TestCase):
+  """Tests for per rule profiling."""
+
+  def testProfile(self):
+    """Rules are counted while the profiler is installed, and unchanged afterwards."""
+    content = '@implementation A\n\n- (void)a;\n{\n    if (x) {\n        y();\n    }\n}\n\n@end\n'
+    expected = [str(part) for part in checkFile('a.m', StringIO.StringIO(content))]
+
+    with profiler.RuleProfiler() as ruleProfiler:
+      self.assertEquals(expected, [str(part) for part in checkFile('a.m', StringIO.StringIO(content))])
+    self.assertFalse('parse' in vars(parsing.grammar(False).statement))
+    self.assertFalse('parse' in vars(parsing.grammar(False).implementation))
+
+    stats = ruleProfiler.stats
+    self.assertEquals(1, stats['implementation'].successes)
+    self.assertEquals(stats['ifStmt'].calls, stats['ifStmt'].successes + stats['ifStmt'].failures)
+    self.assertTrue(stats['statement'].reattempts > 0)
+    self.assertTrue(stats['codeBlock'].inclusive >= stats['codeBlock'].exclusive)
+
+    out = StringIO.StringIO()
+    ruleProfiler.writeJson(out)
+    self.assertEquals(stats['method'].calls, json.loads(out.getvalue())['method']['calls'])
@@ -15,91 +15,36 @@
 """Objective C style rules."""
 
 import functools
-from parcon import AnyChar, First, Forward, Literal, Present, Regex, Translate, SignificantLiteral
+import parcon
+from parcon import First, Literal, Present, Regex, Translate, SignificantLiteral
 from parcon import separated
-from parcon import failure, match
+from parcon import failure, match, EAnyChar, EUnsatisfiable
 
-import inspect
 import re
 
-from ocstyle.error import Error
-from ocstyle.handlers import drop, justErrors, stringsAndErrors
+from ocstyle.error import Error, Span
+from ocstyle.handlers import drop, flatten, justErrors, stringsAndErrors
+from ocstyle.parsing import Forward, Nested, SpaceRun, TranslateWithPosition, currentContext, error, grammar, rule
 
 
 VERBOSE = True
 
-TAB_SIZE = 4
-
-LINES = []
-
 # PyLint has a very hard time with our decorator pattern.  # pylint: disable=E1120
 
 
-def setupLines(content, maxLineLength):
-  """Setup line position data."""
-  LINES[:] = []
-  pos = -1
-  LINES.append(0)
-  while True:
-    pos = content.find('\n', pos + 1)
-    if pos == -1:
-      break
-    LINES.append(pos)
-
-  errors = []
-  for lineNo in range(1, len(LINES)):
-    lineLength = LINES[lineNo] - LINES[lineNo - 1] - 1 # Remove the \n character.
-    if lineLength > maxLineLength:
-      errors.append(Error(
-        'LineTooLong', 'Line too long: %d chars over the %d limit' % (lineLength, maxLineLength),
-        LINES[lineNo], LINES))
-  return errors
-
-
-
-class TranslateWithPosition(Translate):
-  """Like Translate, but also passes position."""
-
-  def __init__(self, parser, function, passPosition=None):
-    Translate.__init__(self, parser, function)
-    self._passPosition = len(inspect.getargspec(function).args) == 2 if passPosition is None else passPosition
-
-
-  def parse(self, text, position, endPosition, space):
-    result = self.parser.parse(text, position, endPosition, space)
-    if not result:
-      return failure(result.expected)
-    if self._passPosition:
-      translated = self.function(result.value, result.end)
-    else:
-      translated = self.function(result.value)
-    return match(result.end, translated, result.expected)
-
-
-def rule(parserPart):
-  """Decorator for rule syntax."""
-
-  def decorator(f):
-    """The actual decorator."""
-    return TranslateWithPosition(parserPart, f)
-
-  return decorator
-
-
 def noOut(_):
   """Outputs nothing."""
   return None
 
 
-
 def keep(literal):
   """Shorter name for this function."""
   return SignificantLiteral(literal)
 
 
 def unexpectedHandler(kind, value, pos):
-  """Handle a syntactically but not stylistically valid token."""
-  return Error(kind, 'Did not expect %r here' % value, pos, LINES)
+  """Handle a syntactically but not stylistically valid token, which is fixed by removing it."""
+  return error(kind, 'Did not expect %r here' % value, pos, (pos - len(value), pos, ''))
 
 
 def unexpected(kind, pattern):
@@ -110,7 +55,7 @@ def unexpected(kind, pattern):
 def expectedHandler(kind, message, value, pos):
   """Handle a syntactically but not stylistically optional token."""
   if not value:
-    return Error(kind, message, pos, LINES)
+    return error(kind, message, pos)
 
 
 def expected(kind, message, pattern):
@@ -126,14 +71,16 @@ def sp(expectedCount):
     """The callback for the rule."""
     count = len(value)
     if expectedCount > count:
-      return Error('MissingSpace', 'Expected %d, got %d' % (expectedCount, count), pos, LINES)
+      return error('MissingSpace', 'Expected %d, got %d' % (expectedCount, count), pos,
+                   (pos - count, pos, ' ' * expectedCount))
     elif expectedCount < count:
-      return Error('ExtraSpace', 'Expected %d, got %d' % (expectedCount, count), pos, LINES)
+      return error('ExtraSpace', 'Expected %d, got %d' % (expectedCount, count), pos,
+                   (pos - count, pos, ' ' * expectedCount))
 
-  return TranslateWithPosition(Regex(r'[ \t]*'), cb)
+  return TranslateWithPosition(SpaceRun(), cb)
 
 
-xsp = unexpected('ExtraSpace', Regex(r'[ \t]+')) # Breaking naming scheme to match functions. # pylint: disable=C0103
+xsp = unexpected('ExtraSpace', SpaceRun(1)) # Breaking naming scheme to match functions. # pylint: disable=C0103
 
 nlOrSp = '\n' | sp(1) # Breaking naming scheme to match functions. # pylint: disable=C0103
 
@@ -143,7 +90,7 @@ def lineComment(value, pos):
   """A line comment."""
   value = value.lstrip()
   if len(value) > 2 and value[2] != ' ':
-    return Error('MissingSpace', 'Should have space after //', pos, LINES)
+    return error('MissingSpace', 'Should have space after //', pos)
 
 
 @rule(Regex(r'#(pragma|ifdef|endif|else|if|define)(([^\\\n]+)|(\\[ \t]*\S)|(\\[ \t]*\n))*'))
@@ -158,7 +105,7 @@ def docComment(value, pos):
   value = value.lstrip()
   stripped = value.lstrip('/').lstrip('*')
   if stripped and stripped[0] not in (' ', '\n'):
-    return Error('MissingSpace', 'Should have space after /*', pos, LINES)
+    return error('MissingSpace', 'Should have space after /*', pos)
 
 
 @rule(lineComment | docComment | directive)
@@ -207,17 +154,7 @@ def identifier(value):
 def className(value, position):
   """A name of a class."""
   if not value[0].isupper():
-    return Error('BadClassName', 'Class names must be capitalized', position, LINES)
-  return None
-
-
-@rule(identifier[1])
-def selectorPartName(value, position):
-  """A name of a class."""
-  if value[0] == '_' and value[1].islower():
-    return Error('PrivateSelectorInHeader', 'Selectors starting with _ can not be in header files', position, LINES)
-  if not value[0].islower():
-    return Error('BadSelectorPartName', 'Selector names must not be capitalized', position, LINES)
+    return error('BadClassName', 'Class names must be capitalized', position)
   return None
 
 
@@ -225,8 +162,8 @@ def selectorPartName(value, position):
 def ivarName(value, position):
   """A name of a class."""
   if not value[0] == '_' or not value[1].islower():
-    return Error(
-        'BadInstanceVariableName', 'Instance variable names start with _ and not be capitalized', position, LINES)
+    return error(
+        'BadInstanceVariableName', 'Instance variable names start with _ and not be capitalized', position)
   return None
 
 
@@ -234,7 +171,7 @@ def ivarName(value, position):
 def parameterName(value, position):
   """A name of a class."""
   if not value[0].islower():
-    return Error('BadParameterName', 'Parameter names must not be capitalized', position, LINES)
+    return error('BadParameterName', 'Parameter names must not be capitalized', position)
   return None
 
 
@@ -250,9 +187,6 @@ def baseClasses(value):
   return justErrors(value)
 
 
-filePart = Forward() # Breaking naming scheme to match functions. # pylint: disable=C0103
-
-
 @rule(Literal('@end'))
 def end(_):
   """End of an interface, protocol, or implementation."""
@@ -269,7 +203,7 @@ def cTypeSizeModifier(value):
 def sizedCType(value, position):
   """A type modifier."""
   for m in re.compile(r'\s\s+').finditer(value):
-    return Error('ExtraSpace', 'Extra space in type name', position + m.start(), LINES)
+    return error('ExtraSpace', 'Extra space in type name', position + m.start())
   return None
 
 
@@ -353,73 +287,32 @@ def ivarBlock(value):
   return justErrors(value)
 
 
-@rule(selectorPartName + xsp + ':' + xsp + '(' + xsp + objcType + xsp + ')' + xsp + parameterName)
-def selectorPart(value):
-  """A part of a selector."""
-  return justErrors(value)
-
-
 @rule((xsp + '\n' + +First(' ', '\t')) | sp(1))
 def singleSpaceOrLineWrap(value):
   """Single space or line wrap."""
   return justErrors(value)
 
 
-@rule(selectorPart + (singleSpaceOrLineWrap + selectorPart)[...])
-def selectorWithParams(value):
-  """Multipart selector."""
-  return justErrors(value)
-
-
 @rule('(' + xsp + objcType + -docComment + xsp + ')') # TODO(robbyw): More generic fix for random comments.
 def methodReturnType(value):
   """A method signature return type."""
   return justErrors(value)
 
 
-@rule(Regex('[-+]')[noOut] + sp(1) + methodReturnType + xsp + (selectorWithParams | selectorPartName))
-def methodSignature(value):
-  """A method signature."""
-  return justErrors(value)
-
-
-@rule(methodSignature + ';')
-def methodDeclaration(value):
-  """A method declaration."""
-  return justErrors(value)
-
-
 @rule(identifier[1])
 def propertyName(value, position):
   """Checks a property name."""
   if not value[0].islower():
-    return Error('BadPropertyName', 'Property names must not be capitalized', position, LINES)
+    return error('BadPropertyName', 'Property names must not be capitalized', position)
   return None
 
 
-@rule(Regex(r'readonly|atomic|nonatomic|copy|assign|retain|strong|weak')[drop] |
-      (Regex(r'[gs]etter')[drop] + sp(1) + '=' + sp(1) + selectorPartName))
-def propertyOption(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
-  """Option for a property."""
-  return justErrors(value)
-
-
-@rule('(' + xsp + propertyOption + xsp + (',' + sp(1) + propertyOption)[...] + xsp + ')' + sp(1))
-def propertyOptions(value):
-  """List of options for a property."""
-  return justErrors(value)
-
-
-def expectedDoc(kind, message):
-  """Expected documentation."""
-  return expected(kind, message, docComment + xsp + '\n' + xsp)
-
-
-@rule(expectedDoc('ExpectedPropertyDocInHeader', 'Property requires /** documentation */') +
-      '@property' + sp(1) + -propertyOptions + -('IBOutlet ' + xsp) + namedVariable(propertyName) + xsp + ';')
-def propertyDeclaration(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
-  """A property declaration."""
-  return justErrors(value)
+def expectedDoc(header, kind, message):
+  """Expected documentation.  Outside headers it is not required, but is still consumed the same way."""
+  documentation = docComment + xsp + '\n' + xsp
+  if header:
+    return expected(kind, message, documentation)
+  return -documentation[noOut]
 
 
 @rule(First('@required', '@optional'))
@@ -434,54 +327,21 @@ def macroCall(value):
   return justErrors(value)
 
 
-@rule(((xsp + (declarationSection | methodDeclaration | propertyDeclaration)) |
-       macroCall | anyPreprocessor | (xsp + '\n'))[...])
-def declarations(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
-  """Declarations area of an interface."""
-  return justErrors(value)
-
-
-@rule(expectedDoc('ExpectedInterfaceDocInHeader', 'Interface requires /** documentation */') +
-      '@interface' + sp(1) + className + -baseClasses +
-      -(nlOrSp + implementedProtocols) +
-      -(nlOrSp + ivarBlock) +
-      declarations +
-      end)
-def interface(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
-  """Interface declaration."""
-  return stringsAndErrors(value)
-
-
-@rule(expectedDoc('ExpectedProtocolDocInHeader', 'Protocol requires /** documentation */') +
-      '@protocol' + sp(1) + className + -baseClasses + -(sp(1) + implementedProtocols) + xsp + '\n' +
-      declarations +
-      end)
-def protocolDeclaration(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
-  """Interface declaration."""
-  return stringsAndErrors(value)
-
+implementationStart = '@implementation' + sp(1) + className + -(sp(1) + ivarBlock) # pylint: disable=C0103
 
-@rule('@implementation' + sp(1) + className + -(sp(1) + ivarBlock) + (filePart - end)[...] + end)
-def implementation(value):
-  """Implementation section."""
-  return stringsAndErrors(value)
 
-
-codeBlock = Forward() # Breaking naming scheme to match functions. # pylint: disable=C0103
+codeBlock = Nested('{') # Breaking naming scheme to match functions. # pylint: disable=C0103
 
 
 @rule(identifier[1])
 def namespaceName(value, position):
   """A name of a namespace."""
   if not value[0].islower():
-    return Error('BadNamespaceName', 'Namespace name must start with a lower case letter', position, LINES)
+    return error('BadNamespaceName', 'Namespace name must start with a lower case letter', position)
   return None
 
 
-@rule('namespace' + sp(1) + namespaceName + Regex(r'\n?\s*')[drop] + '{' + (filePart - '}')[...] + '}')
-def namespace(value):
-  """Namespace block."""
-  return stringsAndErrors(value)
+namespaceStart = 'namespace' + sp(1) + namespaceName + Regex(r'\n?\s*')[drop] + '{' # pylint: disable=C0103
 
 
 @rule(Regex('(class|struct) ')[drop] + xsp + className + -(Regex('[^{;]+')[drop] + codeBlock[drop]) + ';')
@@ -495,12 +355,12 @@ def cppClass(value):
 def localVarName(value, position):
   """A name of a class."""
   if not value[0].islower():
-    return Error('BadLocalVariableName', 'Local variable must start with a lower case letter', position, LINES)
+    return error('BadLocalVariableName', 'Local variable must start with a lower case letter', position)
   return None
 
 
 # A near-total hack to stand in for expressions.
-expression = Forward() # Breaking naming scheme to match functions. # pylint: disable=C0103
+expression = Nested('(', 1) # Breaking naming scheme to match functions. # pylint: disable=C0103
 
 
 @rule(Regex(r'[^();]*[^();\s]')[drop] | ('(' + -expression + ')'))
@@ -565,13 +425,17 @@ codeBlock.set(Translate('{' + +codeBlockBody + '}', stringsAndErrors))
 
 @rule(Regex('[ \t]*') + -keep('\n'))
 def shouldBeNewline(result, pos):
-  """Expect a newline here."""
+  """Expect a newline here.  The fix replaces the spaces before the missing newline with one, indenting the next line
+  as much as this one."""
   if not isinstance(result, tuple):
-    return Error('MissingNewline', 'Should have newline after ;', pos, LINES)
+    context = currentContext()
+    line = context.content[context.content.rfind('\n', 0, pos) + 1:pos] if context else ''
+    indent = line[:len(line) - len(line.lstrip(' \t'))]
+    return error('MissingNewline', 'Should have newline after ;', pos, (pos - len(result or ''), pos, '\n' + indent))
 
 
 @rule(-(xsp + keep(';')) + shouldBeNewline + xsp)
-def shouldBeSemicolonAndNewline(result, pos):
+def shouldBeSemicolonAndNewline(result, start, pos):
   """A place where there should a semicolon, but compiler-wise it is optional."""
   errors = []
   if result:
@@ -582,28 +446,198 @@ def shouldBeSemicolonAndNewline(result, pos):
       errors.extend([e for e in result if isinstance(e, Error)])
 
   if not result:
-    errors.append(Error('MissingSemicolon', 'Expected a semicolon', pos, LINES))
+    fix = (start, start, ';')
+    for i, err in enumerate(errors):
+      if err.kind == 'MissingNewline' and err.edit[0] == start: # One edit, so the semicolon goes before the newline.
+        fix = (start, err.edit[1], ';' + err.edit[2])
+        errors[i] = error(err.kind, err.message, err.position, fix)
+    errors.append(error('MissingSemicolon', 'Expected a semicolon', pos, fix))
 
   return errors or None
 
 
-@rule(methodSignature + shouldBeSemicolonAndNewline + codeBlock)
-def method(value):
-  """A method."""
-  return stringsAndErrors(value)
-
-
 @rule(First('@class ', '@protocol ') + xsp + anyIdentifier + xsp + ';')
 def forwardDeclaration(value):
   """A forward declaration of a class."""
   return justErrors(value)
 
 
-filePart.set(inclusion | interface | implementation | cppClass | namespace | '\n' | ' ' | method | methodDeclaration |
-             protocolDeclaration | forwardDeclaration | string | objcString | codeBlock | anyPreprocessor | AnyChar())
+class Unparsed(parcon.Parser):
+  """Matches the text up to the next position where a filePart could start, as a Span, to resync after nothing else
+  matched.
+
+  This is the same text that matching AnyChar() over and over would consume, without trying every filePart on each
+  character.  The '}' stops the run as well so that a namespace sees its closing brace.
+  """
+
+  SKIP = re.compile(r'(?:[^#@ \t\n/+"{}cns-]|c(?!lass )|s(?!truct )|n(?!amespace))*')
+
+
+  def parse(self, text, position, endPosition, space):
+    position = space.consume(text, position, endPosition)
+    if position >= endPosition:
+      return failure([(position, EAnyChar())])
+    skipEnd = self.SKIP.match(text, position + 1, endPosition).end()
+    context = currentContext()
+    return match(skipEnd, Span(text, ((position, skipEnd),), context.lines if context else None),
+                 [(skipEnd, EUnsatisfiable())])
+
+
+  def __repr__(self):
+    return 'Unparsed()'
+
+
+
+class Grammar(object):
+  """The rules for one type of file, as attributes: the rules of this module, which every type shares, and the rules
+  that build makes for the type."""
+
+  def __init__(self, header, rules):
+    self.__dict__.update((name, value) for name, value in globals().iteritems() if isinstance(value, parcon.Parser))
+    self.__dict__.update(rules)
+    self.header = header
+
+
+
+class LazyGrammar(object):
+  """The rules of the grammar for header files, or for implementation files if header is False, as attributes.  The
+  grammar is only built when one of them is first used."""
+
+  def __init__(self, header):
+    self.header = header
+
+
+  def __getattr__(self, name):
+    return getattr(grammar(self.header), name)
+
+
+DEFAULT = LazyGrammar(True)
+
+
+def build(header):
+  """Builds the grammar for header files, or for implementation files if header is False.
+
+  Only the rules that check what headers need, and the rules containing them, differ between the two.  The
+  implementation variant leaves those checks out but matches the same text.
+  """
+
+  @rule(identifier[1])
+  def selectorPartName(value, position):
+    """A name of a class."""
+    if value[0] == '_' and value[1].islower():
+      return error('PrivateSelectorInHeader', 'Selectors starting with _ can not be in header files', position) \
+          if header else None
+    if not value[0].islower():
+      return error('BadSelectorPartName', 'Selector names must not be capitalized', position)
+    return None
+
+
+  filePart = Forward() # Breaking naming scheme to match functions. # pylint: disable=C0103
+
+
+  @rule(selectorPartName + xsp + ':' + xsp + '(' + xsp + objcType + xsp + ')' + xsp + parameterName)
+  def selectorPart(value):
+    """A part of a selector."""
+    return justErrors(value)
+
+
+  @rule(selectorPart + (singleSpaceOrLineWrap + selectorPart)[...])
+  def selectorWithParams(value):
+    """Multipart selector."""
+    return justErrors(value)
+
+
+  @rule(Regex('[-+]')[noOut] + sp(1) + methodReturnType + xsp + (selectorWithParams | selectorPartName))
+  def methodSignature(value):
+    """A method signature."""
+    return justErrors(value)
+
+
+  @rule(methodSignature + ';')
+  def methodDeclaration(value):
+    """A method declaration."""
+    return justErrors(value)
+
+
+  @rule(Regex(r'readonly|atomic|nonatomic|copy|assign|retain|strong|weak')[drop] |
+        (Regex(r'[gs]etter')[drop] + sp(1) + '=' + sp(1) + selectorPartName))
+  def propertyOption(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
+    """Option for a property."""
+    return justErrors(value)
+
+
+  @rule('(' + xsp + propertyOption + xsp + (',' + sp(1) + propertyOption)[...] + xsp + ')' + sp(1))
+  def propertyOptions(value):
+    """List of options for a property."""
+    return justErrors(value)
+
+
+  @rule(expectedDoc(header, 'ExpectedPropertyDocInHeader', 'Property requires /** documentation */') +
+        '@property' + sp(1) + -propertyOptions + -('IBOutlet ' + xsp) + namedVariable(propertyName) + xsp + ';')
+  def propertyDeclaration(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
+    """A property declaration."""
+    return justErrors(value)
+
+
+  @rule(((xsp + (declarationSection | methodDeclaration | propertyDeclaration)) |
+         macroCall | anyPreprocessor | (xsp + '\n'))[...])
+  def declarations(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
+    """Declarations area of an interface."""
+    return justErrors(value)
+
+
+  @rule(expectedDoc(header, 'ExpectedInterfaceDocInHeader', 'Interface requires /** documentation */') +
+        '@interface' + sp(1) + className + -baseClasses +
+        -(nlOrSp + implementedProtocols) +
+        -(nlOrSp + ivarBlock) +
+        declarations +
+        end)
+  def interface(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
+    """Interface declaration."""
+    return stringsAndErrors(value)
+
+
+  @rule(expectedDoc(header, 'ExpectedProtocolDocInHeader', 'Protocol requires /** documentation */') +
+        '@protocol' + sp(1) + className + -baseClasses + -(sp(1) + implementedProtocols) + xsp + '\n' +
+        declarations +
+        end)
+  def protocolDeclaration(value): # 2 lines check is broken due to decorator wrapping. # pylint: disable=W9911
+    """Interface declaration."""
+    return stringsAndErrors(value)
+
+
+  @rule(implementationStart + (filePart - end)[...] + end)
+  def implementation(value):
+    """Implementation section."""
+    return stringsAndErrors(value)
+
+
+  @rule(namespaceStart + (filePart - '}')[...] + '}')
+  def namespace(value):
+    """Namespace block."""
+    return stringsAndErrors(value)
+
+
+  # Rules whose value is the errors and unparsed text of a run of fileParts between an opening and a closing that give
+  # none, as (opening, closing) pairs, so that an incremental check can parse a single part of the body again.  Where an
+  # opening matches, no filePart alternative before its rule does.
+  CONTAINERS = ((implementationStart, end), (namespaceStart, Literal('}')))
+
+
+  @rule(methodSignature + shouldBeSemicolonAndNewline + codeBlock)
+  def method(value):
+    """A method."""
+    return stringsAndErrors(value)
+
+
+  filePart.set(inclusion | interface | implementation | cppClass | namespace | '\n' | ' ' | method |
+               methodDeclaration | protocolDeclaration | forwardDeclaration | string | objcString | codeBlock |
+               anyPreprocessor | Unparsed())
+
 
+  @rule(+filePart)
+  def entireFile(value):
+    """The entire file."""
+    return flatten(stringsAndErrors(value))
 
-@rule(+filePart)
-def entireFile(value):
-  """The entire file."""
-  return stringsAndErrors(value)
+  return Grammar(header, locals())
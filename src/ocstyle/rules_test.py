@@ -18,7 +18,7 @@ from parcon import Exact
 
 import unittest
 
-from ocstyle import rules
+from ocstyle import parsing, rules
 
 
 
@@ -59,30 +59,32 @@ class RulesTest(unittest.TestCase):
 
   def testSelectorPart(self):
     """Test for selector part."""
-    self.assertMatches(rules.selectorPart, 'initWithKey:(NSString *)key')
+    self.assertMatches(rules.DEFAULT.selectorPart, 'initWithKey:(NSString *)key')
 
 
   def testMethodDeclaration(self):
     """Test for the method declaration rule."""
-    self.assertMatches(rules.methodDeclaration, '- (BOOL)isSet;')
-    self.assertMatches(rules.methodDeclaration, '- (id)initWithKey: (NSString *)key;')
-    self.assertMatches(rules.methodDeclaration, '- (NSArray *)loadWithManager:(id)manager message:(id)message;')
-    self.assertMatches(rules.methodDeclaration, '- (NSArray *)loadWithManager:(id)manager\n    message:(id)message;')
-    self.assertMatches(rules.methodDeclaration, '- (void)successfullyDeletedIndexWithId:(int64_t)indexId;')
+    self.assertMatches(rules.DEFAULT.methodDeclaration, '- (BOOL)isSet;')
+    self.assertMatches(rules.DEFAULT.methodDeclaration, '- (id)initWithKey: (NSString *)key;')
+    self.assertMatches(rules.DEFAULT.methodDeclaration, '- (NSArray *)loadWithManager:(id)manager message:(id)message;')
+    self.assertMatches(rules.DEFAULT.methodDeclaration,
+                       '- (NSArray *)loadWithManager:(id)manager\n    message:(id)message;')
+    self.assertMatches(rules.DEFAULT.methodDeclaration, '- (void)successfullyDeletedIndexWithId:(int64_t)indexId;')
 
 
   def testPropertyDeclaration(self):
     """Test for property declarations."""
-    self.assertMatches(rules.propertyDeclaration, '@property BOOL shouldForceFrame;')
-    self.assertMatches(rules.propertyDeclaration, '@property (readonly) SCNavigationBar * fakeBackground;')
-    self.assertMatches(rules.propertyDeclaration, '@property(nonatomic, getter=isEnabled) BOOL enabled;')
-    self.assertMatches(rules.propertyDeclaration, '@property (retain) IBOutlet UIImageView *backArrow;')
-    self.assertMatches(rules.propertyDeclaration, '@property (copy) void (^onContentPresented)(CUTableViewItem *item);')
+    self.assertMatches(rules.DEFAULT.propertyDeclaration, '@property BOOL shouldForceFrame;')
+    self.assertMatches(rules.DEFAULT.propertyDeclaration, '@property (readonly) SCNavigationBar * fakeBackground;')
+    self.assertMatches(rules.DEFAULT.propertyDeclaration, '@property(nonatomic, getter=isEnabled) BOOL enabled;')
+    self.assertMatches(rules.DEFAULT.propertyDeclaration, '@property (retain) IBOutlet UIImageView *backArrow;')
+    self.assertMatches(rules.DEFAULT.propertyDeclaration,
+                       '@property (copy) void (^onContentPresented)(CUTableViewItem *item);')
 
 
   def testEmptyProtocol(self):
     """Test an empty protocol."""
-    self.assertMatches(rules.protocolDeclaration, '@protocol TheName\n@end')
+    self.assertMatches(rules.DEFAULT.protocolDeclaration, '@protocol TheName\n@end')
 
 
   def testSimpleType(self):
@@ -104,13 +106,13 @@ class RulesTest(unittest.TestCase):
 
   def testInterfaceDeclaration(self):
     """Test for interface declarations."""
-    self.assertMatches(rules.interface, '@interface ABC\n<DEF>\n@end')
-    self.assertMatches(rules.interface, '@interface LETImageAttributes : NSObject<NSCopying>\n@end')
+    self.assertMatches(rules.DEFAULT.interface, '@interface ABC\n<DEF>\n@end')
+    self.assertMatches(rules.DEFAULT.interface, '@interface LETImageAttributes : NSObject<NSCopying>\n@end')
 
 
   def testMethod(self):
     """Test for method."""
-    self.assertMatches(rules.method, '''
+    self.assertMatches(rules.DEFAULT.method, '''
 + (NSString *)serverAddressWithSubdomain:(NSString *)subdomain;
 {
     return FORMAT(@"%@://%@", [self serverProtocol], [self serverHostWithSubdomain:subdomain]);
@@ -123,7 +125,18 @@ class RulesTest(unittest.TestCase):
     self.assertMatches(rules.macroCall, 'CCBlockProperty(BlockURLHandler, withCheckBlock, (URLHandlingBlock));')
 
 
+  def testUnparsed(self):
+    """Test that unparsed text runs up to the next place a file part could start."""
+    unparsed = rules.Unparsed()
+    self.assertEquals('int', unparsed.parse_string('int x;', False, parsing.NO_SPACE).text())
+    self.assertEquals('a=b;', unparsed.parse_string('a=b;@end', False, parsing.NO_SPACE).text())
+    self.assertEquals('}', unparsed.parse_string('}}', False, parsing.NO_SPACE).text())
+    self.assertEquals('myclass;', unparsed.parse_string('myclass;', False, parsing.NO_SPACE).text())
+    self.assertEquals('my', unparsed.parse_string('myclass X;', False, parsing.NO_SPACE).text())
+    self.assertEquals(((1, 3),), unparsed.parse('ab;@end', 1, 7, parsing.NO_SPACE).value.ranges)
+
+
   def testNamespace(self):
     """Test for namespace."""
-    self.assertMatches(rules.namespace, 'namespace com {}')
-    self.assertMatches(rules.namespace, 'namespace com\n{\n}')
+    self.assertMatches(rules.DEFAULT.namespace, 'namespace com {}')
+    self.assertMatches(rules.DEFAULT.namespace, 'namespace com\n{\n}')
@@ -0,0 +1,115 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parses a large file in chunks on several processes.
+
+A file is a sequence of top level parts, each parsed from where the last one ended, so the parse from any position
+where a part starts is the same whatever came before it.  Chunks start at lines that usually begin a part, and each
+chunk is parsed, from its start in the whole text so that positions need no adjusting, until it reaches the next
+chunk.  Chunks are then chained from the start of the file: a chunk is used only if the chain lands exactly on its
+start, and any stretch where it does not is parsed again in order.  The result is exactly that of parsing the whole
+file.
+"""
+
+import multiprocessing
+import re
+
+from ocstyle import parsing
+from ocstyle.error import Error, Span
+from ocstyle.handlers import flatten, stringsAndErrors
+
+
+MINIMUM_BYTES = 64 * 1024
+
+CHUNKS_PER_PROCESS = 4 # Smaller chunks balance the work better, but overshoot the start of the next chunk more often.
+
+CHUNK_START = re.compile(r'^(?:@implementation|@interface|@protocol|namespace)\b', re.MULTILINE)
+
+# The text being parsed in chunks, shared with forked workers instead of being sent to each of them.
+_WORK = {}
+
+
+def chunkStarts(content, chunks):
+  """Positions to start each of about the given number of chunks, beginning with 0."""
+  starts = [0]
+  size = len(content) / chunks
+  for m in CHUNK_START.finditer(content):
+    if m.start() - starts[-1] >= size:
+      starts.append(m.start())
+  return starts
+
+
+def parseParts(context, start, stop):
+  """Parses top level parts from start until one ends at or after stop.  Returns the end and the flattened values."""
+  content = context.content
+  filePart = context.rules.filePart
+  position = start
+  values = []
+  with context:
+    while position < stop:
+      result = filePart.parse(content, position, len(content), parsing.NO_SPACE)
+      values.extend(flatten(result.value))
+      position = result.end
+  return position, values
+
+
+def _parseChunk(bounds):
+  """Parses a chunk in a worker, returning errors as tuples and spans as lists of their ranges, to save sending the
+  line data and content back with each."""
+  if 'context' not in _WORK:
+    _WORK['context'] = parsing.CheckContext(_WORK['content'], _WORK['maxLineLength'], _WORK['memoEntries'],
+                                            _WORK['header'])
+  start, stop = bounds
+  end, values = parseParts(_WORK['context'], start, stop)
+  return start, end, [(value.kind, value.message, value.position, value.edit) if isinstance(value, Error)
+                      else list(value.ranges) for value in values]
+
+
+def parse(context, jobs=0, minimumBytes=MINIMUM_BYTES):
+  """Parses the whole text of the context, in chunks on the given number of processes if it is at least minimumBytes.
+
+  Returns the same result as parsing the text with entireFile.
+  """
+  content = context.content
+  processes = jobs or multiprocessing.cpu_count()
+  if len(content) < minimumBytes or processes == 1 or multiprocessing.current_process().daemon:
+    return stringsAndErrors(parseParts(context, 0, len(content))[1]) or []
+
+  starts = chunkStarts(content, processes * CHUNKS_PER_PROCESS)
+  _WORK.update(content=content, maxLineLength=context.maxLineLength,
+               memoEntries=context.memo.maxEntries if context.memo else 0, header=context.header)
+  try:
+    pool = multiprocessing.Pool(min(processes, len(starts)))
+    try:
+      chunkResults = pool.map(_parseChunk, zip(starts, starts[1:] + [len(content)]), 1)
+      pool.close()
+    finally:
+      pool.terminate()
+      pool.join()
+  finally:
+    _WORK.clear()
+
+  byStart = dict((start, (end, values)) for start, end, values in chunkResults)
+  position = 0
+  values = []
+  while position < len(content):
+    if position in byStart:
+      position, chunkValues = byStart.pop(position)
+      values.extend(Error(value[0], value[1], value[2], context.lines, value[3]) if isinstance(value, tuple)
+                    else Span(content, tuple(value), context.lines) for value in chunkValues)
+    else: # The chain overshot the start of a chunk, so parse until it lands on one.
+      nextStart = min([start for start in byStart if start > position] or [len(content)])
+      position, partValues = parseParts(context, position, nextStart)
+      values.extend(partValues)
+  return stringsAndErrors(values) or []
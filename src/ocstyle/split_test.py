@@ -0,0 +1,50 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for parsing files in chunks."""
+
+import os.path
+import pkg_resources
+import unittest
+
+import parcon
+
+from ocstyle import parsing, split
+
+
+
+class SplitTest(unittest.TestCase):
+  """Tests for parsing files in chunks."""
+
+  def assertSameParse(self, content):
+    """Parsing in chunks gives the same result as parsing the whole file."""
+    context = parsing.CheckContext(content)
+    with context:
+      expected = parcon.Exact(context.rules.entireFile, parsing.NO_SPACE).parse_string(content)
+    for jobs in (1, 2, 3):
+      self.assertEquals([str(part) for part in expected],
+                        [str(part) for part in split.parse(parsing.CheckContext(content), jobs, 0)])
+
+
+  def testSampleFiles(self):
+    """Sample files parse the same in chunks."""
+    for filename in ('Parsing.h', 'Parsing.m'):
+      self.assertSameParse(pkg_resources.resource_string('ocstyle', os.path.join('testdata', filename)))
+
+
+  def testOvershoot(self):
+    """Chunks that do not start where a part starts are parsed again in order."""
+    content = '@interface A\n@end\n/*\n@interface B\n@end\n*/\n@implementation  C\n@end\n"\n@protocol D\n"\nx;\n'
+    self.assertEquals([0, 21, 42, 68], split.chunkStarts(content, 10))
+    self.assertSameParse(content * 3)
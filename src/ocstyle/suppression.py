@@ -0,0 +1,106 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Comments that turn off errors for parts of a file.
+
+A "// ocstyle:disable=BadClassName,ExtraSpace" comment turns those kinds of error off for the line it is on, and
+"// ocstyle:disable-begin=BadClassName" and "// ocstyle:disable-end=BadClassName" comments turn them off from the line
+of the first through the line of the second.  Without a list of kinds, every kind is turned off.  A region that is not
+ended lasts until the end of the file.
+"""
+
+import bisect
+import re
+
+from ocstyle.error import Error
+from ocstyle.lexer import COMMENT, Tokens
+
+
+ALL = '*'
+
+MARKER = 'ocstyle:'
+
+DIRECTIVE = re.compile(r'ocstyle:(disable-begin|disable-end|disable)(?![\w-])(?:=(\w+(?:[ \t]*,[ \t]*\w+)*))?')
+
+
+
+class Suppressions(object):
+  """The suppressed ranges of positions in a file for each kind of error, as sorted lists of starts and ends that
+  can be searched with bisect."""
+
+  def __init__(self, ranges):
+    self.index = {}
+    for kind, kindRanges in ranges.iteritems():
+      starts = []
+      ends = []
+      for start, end in sorted(kindRanges):
+        if ends and start <= ends[-1]:
+          ends[-1] = max(ends[-1], end)
+        else:
+          starts.append(start)
+          ends.append(end)
+      self.index[kind] = (starts, ends)
+
+
+  def __len__(self):
+    return sum(len(starts) for starts, _ in self.index.itervalues())
+
+
+  def suppresses(self, kind, position):
+    """Whether an error of the given kind at the given position is turned off."""
+    for key in (kind, ALL):
+      ranges = self.index.get(key)
+      if ranges:
+        starts, ends = ranges
+        i = bisect.bisect_right(starts, position) - 1
+        if i >= 0 and position < ends[i]:
+          return True
+    return False
+
+
+  def filter(self, parts):
+    """The given errors and unparsed text, without the errors that are turned off."""
+    if not self.index:
+      return parts
+    return [part for part in parts if not isinstance(part, Error) or not self.suppresses(part.kind, part.position)]
+
+
+def scan(content):
+  """Finds the suppression comments in the content.  The content is only split into lexer tokens, to skip text outside
+  comments, if it has the marker."""
+  ranges = {}
+  regions = {}
+  tokens = None
+  position = content.find(MARKER)
+  while position != -1:
+    m = DIRECTIVE.match(content, position)
+    if tokens is None:
+      tokens = Tokens(content)
+    index = tokens.indexAt(position)
+    if m and tokens.kinds[index] == COMMENT and m.end() <= tokens.end(index):
+      lineStart = content.rfind('\n', 0, position) + 1
+      lineEnd = content.find('\n', position) + 1 or len(content) + 1 # Includes the newline, where LineTooLong is.
+      directive, kinds = m.groups()
+      for kind in [kind.strip() for kind in kinds.split(',')] if kinds else [ALL]:
+        if directive == 'disable':
+          ranges.setdefault(kind, []).append((lineStart, lineEnd))
+        elif directive == 'disable-begin':
+          regions.setdefault(kind, lineStart)
+        elif kind in regions:
+          ranges.setdefault(kind, []).append((regions.pop(kind), lineEnd))
+    position = content.find(MARKER, position + len(MARKER))
+
+  for kind, start in regions.iteritems():
+    ranges.setdefault(kind, []).append((start, len(content) + 1))
+  return Suppressions(ranges)
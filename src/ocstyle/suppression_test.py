@@ -0,0 +1,63 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for suppression comments."""
+
+import StringIO
+import unittest
+
+from ocstyle import main, suppression
+
+
+
+class SuppressionTest(unittest.TestCase):
+  """Tests for suppression comments."""
+
+  def kinds(self, content):
+    """The kinds of error reported for the content."""
+    return [err.kind for err in main.checkFile('a.m', StringIO.StringIO(content), main.Options(60))]
+
+
+  def testScan(self):
+    """Directives apply to their line or region, and only in comments."""
+    content = ('a // ocstyle:disable=A, B\n'
+               'b\n'
+               '/* ocstyle:disable-begin */\n'
+               'c\n'
+               '// ocstyle:disable-end\n'
+               '"ocstyle:disable=C"\n'
+               '// ocstyle:disable-begin=D\n')
+    suppressions = suppression.scan(content)
+    self.assertEquals(4, len(suppressions))
+    self.assertTrue(suppressions.suppresses('A', 0))
+    self.assertTrue(suppressions.suppresses('B', 25)) # The newline ending the line.
+    self.assertFalse(suppressions.suppresses('A', 26))
+    self.assertFalse(suppressions.suppresses('C', 27))
+    self.assertTrue(suppressions.suppresses('C', 28))
+    self.assertTrue(suppressions.suppresses('C', 80))
+    self.assertFalse(suppressions.suppresses('C', 85))
+    self.assertTrue(suppressions.suppresses('D', len(content)))
+
+
+  def testCheck(self):
+    """Suppressed errors are not reported, whether from parsing or from line checks."""
+    longLine = '// ' + 'x' * 60 + '\n'
+    self.assertEquals(['BadClassName', 'LineTooLong'], self.kinds('@interface a\n@end\n' + longLine))
+    self.assertEquals([], self.kinds('@interface a // ocstyle:disable=BadClassName\n@end\n' +
+                                     '// ocstyle:disable-begin=LineTooLong\n' + longLine))
+    self.assertEquals(['BadClassName'], self.kinds('@interface a // ocstyle:disable=LineTooLong\n@end\n'))
+
+    content = '// ocstyle:disable-begin\n@interface a\n@end\n// ocstyle:disable-end\n@interface b\n@end\n'
+    self.assertEquals(['BadClassName'], self.kinds(content))
+    self.assertEquals(['BadClassName'], [err.kind for err in main.iterCheckFile('a.m', StringIO.StringIO(content))])
@@ -0,0 +1,246 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Watches files and directory trees, and checks files again as they change.
+
+On Linux the kernel reports changes through inotify as they happen.  Elsewhere, or if inotify can not be used, the files
+and directories are polled with stat.  Either way, changes are collected until DEBOUNCE_SECONDS pass without another,
+so that a save that writes several times, or a checkout that changes many files, is checked once.
+"""
+
+import ctypes
+import errno
+import os
+import select
+import struct
+import time
+
+from ocstyle import discovery
+
+
+DEBOUNCE_SECONDS = 0.05
+
+MAXIMUM_DELAY_SECONDS = 1 # Changes are checked at least this often while they keep coming.
+
+POLL_SECONDS = 0.5
+
+IN_NONBLOCK = 04000
+IN_CLOEXEC = 02000000
+
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+ENTRY_EVENTS = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT = struct.Struct('iIII') # The watch descriptor, mask, cookie and name length that start each inotify event.
+
+
+
+class Tree(object):
+  """The files to check for the given command line paths, found as discovery.discover does with recursive set, and
+  the directories they are found in."""
+
+  def __init__(self, paths, excludeGlobs=()):
+    self.paths = paths
+    self.excludes = discovery.Excludes(excludeGlobs)
+    self.files = set()
+    self.directories = set()
+    self.refresh()
+
+
+  def refresh(self):
+    """Finds the files and directories again.  Returns the files that were not found before."""
+    files = set()
+    directories = set()
+    for path in self.paths:
+      if self.excludes.matchPathOrParts(path):
+        continue
+      if os.path.isdir(path):
+        files.update(discovery.walk(path, self.excludes, onDirectory=directories.add))
+      else:
+        files.add(path)
+        directories.add(os.path.dirname(path) or os.curdir)
+    added = files - self.files
+    self.files = files
+    self.directories = directories
+    return added
+
+
+  def changesFiles(self, path, isDirectory):
+    """Whether adding, removing or renaming the given path can change which files there are to check."""
+    return isDirectory or path.endswith(discovery.EXTENSIONS) or os.path.basename(path) in discovery.IGNORE_FILES
+
+
+
+class InotifyWatcher(object):
+  """Finds changes to the files in a Tree with inotify, watching each directory in the tree."""
+
+  def __init__(self, tree):
+    self.tree = tree
+    self.libc = ctypes.CDLL(None, use_errno=True)
+    if not hasattr(self.libc, 'inotify_init1'):
+      raise OSError(errno.ENOSYS, 'inotify is not available')
+    self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if self.fd < 0:
+      raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+    self.directories = {}
+    self._watchDirectories()
+
+
+  def _watchDirectories(self):
+    """Watches the directories of the tree that are not watched yet, and stops watching those no longer in it."""
+    for descriptor, directory in self.directories.items():
+      if directory not in self.tree.directories:
+        self.libc.inotify_rm_watch(self.fd, descriptor)
+        del self.directories[descriptor]
+    watched = set(self.directories.itervalues())
+    for directory in self.tree.directories - watched:
+      descriptor = self.libc.inotify_add_watch(self.fd, directory, WATCH_MASK)
+      if descriptor >= 0: # The directory may have gone already.
+        self.directories[descriptor] = directory
+
+
+  def _events(self):
+    """Yields (mask, path) for each event that can be read without blocking."""
+    while True:
+      try:
+        data = os.read(self.fd, 65536)
+      except OSError as e:
+        if e.errno == errno.EAGAIN:
+          return
+        raise
+      offset = 0
+      while offset < len(data):
+        descriptor, mask, _, length = EVENT.unpack_from(data, offset)
+        offset += EVENT.size
+        name = data[offset:offset + length].rstrip('\0')
+        offset += length
+        directory = self.directories.get(descriptor)
+        if mask & IN_IGNORED: # The directory is gone, or no longer watched.
+          self.directories.pop(descriptor, None)
+        elif mask & IN_Q_OVERFLOW or directory is not None:
+          yield mask, os.path.join(directory, name) if directory is not None else None
+
+
+  def changes(self, timeout):
+    """Returns the files to check that changed in the next timeout seconds, or once any do if timeout is None."""
+    if not select.select([self.fd], [], [], timeout)[0]:
+      return set()
+    changed = set()
+    refresh = overflow = False
+    for mask, path in self._events():
+      if mask & IN_Q_OVERFLOW:
+        overflow = True
+      elif mask & ENTRY_EVENTS and self.tree.changesFiles(path, mask & IN_ISDIR):
+        refresh = True
+      changed.add(path)
+    if overflow or refresh:
+      added = self.tree.refresh()
+      self._watchDirectories()
+      if overflow: # Events were lost, so anything may have changed.
+        return set(self.tree.files)
+      changed.update(added)
+    return changed & self.tree.files
+
+
+  def close(self):
+    """Stops watching."""
+    os.close(self.fd)
+
+
+
+class PollingWatcher(object):
+  """Finds changes to the files in a Tree by comparing the stat results of its files and directories over time.
+  Adding, removing or renaming an entry of a directory changes the stat result of the directory."""
+
+  def __init__(self, tree):
+    self.tree = tree
+    self.stats = self._stats()
+
+
+  def _stats(self):
+    """The stat result of each file and directory in the tree that can be read."""
+    stats = {}
+    for path in self.tree.files | self.tree.directories:
+      try:
+        info = os.stat(path)
+      except OSError:
+        continue
+      stats[path] = (info.st_mtime, info.st_size, info.st_ino)
+    return stats
+
+
+  def changes(self, timeout):
+    """Returns the files to check that changed in the next timeout seconds, or in the next POLL_SECONDS if timeout
+    is None."""
+    time.sleep(POLL_SECONDS if timeout is None else timeout)
+    stats = self._stats()
+    changed = set(path for path in self.tree.files if stats.get(path) != self.stats.get(path))
+    if any(stats.get(directory) != self.stats.get(directory) for directory in self.tree.directories):
+      changed.update(self.tree.refresh())
+      stats = self._stats()
+    self.stats = stats
+    return changed & self.tree.files
+
+
+  def close(self):
+    """Stops watching."""
+
+
+def watcher(tree):
+  """An InotifyWatcher for the tree if inotify can be used, or else a PollingWatcher."""
+  try:
+    return InotifyWatcher(tree)
+  except OSError: # There is no inotify, or this user has too many inotify instances.
+    return PollingWatcher(tree)
+
+
+def wait(source):
+  """Blocks until the given InotifyWatcher or PollingWatcher finds changes, and then until DEBOUNCE_SECONDS pass
+  without another.  Returns the sorted paths of the changed files that still exist."""
+  changed = set()
+  while not changed:
+    changed = source.changes(None)
+  deadline = time.time() + MAXIMUM_DELAY_SECONDS
+  while time.time() < deadline:
+    more = source.changes(DEBOUNCE_SECONDS)
+    if not more:
+      break
+    changed.update(more)
+  return sorted(path for path in changed if os.path.isfile(path))
+
+
+def watch(paths, excludeGlobs, check, rounds=None):
+  """Calls check with the sorted files to check for the given command line paths, and then with the files that change
+  each time some do, for the given number of rounds of changes or until interrupted."""
+  tree = Tree(paths, excludeGlobs)
+  changes = watcher(tree) # Started before the first check, so changes made during it are not missed.
+  try:
+    check(sorted(tree.files))
+    while rounds is None or rounds > 0:
+      check(wait(changes))
+      if rounds is not None:
+        rounds -= 1
+  finally:
+    changes.close()
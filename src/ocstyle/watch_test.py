@@ -0,0 +1,102 @@
+# Copyright 2013 The ocstyle Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for watching files for changes."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from ocstyle import watch
+
+
+
+class WatchTest(unittest.TestCase):
+  """Tests for watching files for changes."""
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    os.mkdir(os.path.join(self.directory, 'sub'))
+    self.write('a.h', '@class A;\n')
+    self.write('sub/b.m', '@class B;\n')
+
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+
+  def write(self, name, content):
+    """Writes a file in the test directory and returns its path."""
+    path = os.path.join(self.directory, name)
+    with open(path, 'w') as f:
+      f.write(content)
+    return path
+
+
+  def assertWatches(self, watcherClass):
+    """The watcher reports changed, added and renamed files to check, but not other files."""
+    tree = watch.Tree([self.directory], ['ignored*'])
+    self.assertEquals(2, len(tree.files))
+    watcher = watcherClass(tree)
+    try:
+      path = self.write('sub/b.m', '@class B;\n@class C;\n')
+      self.write('notes.txt', 'x')
+      self.write('ignored.m', '@class D;\n')
+      self.assertEquals([path], watch.wait(watcher))
+
+      os.mkdir(os.path.join(self.directory, 'new'))
+      path = self.write('new/c.h', '@class C;\n')
+      self.assertEquals([path], watch.wait(watcher))
+
+      self.write('a.tmp', '@class A;\n\n')
+      os.rename(os.path.join(self.directory, 'a.tmp'), os.path.join(self.directory, 'a.h'))
+      self.assertEquals([os.path.join(self.directory, 'a.h')], watch.wait(watcher))
+      self.assertEquals(3, len(tree.files))
+    finally:
+      watcher.close()
+
+
+  def testInotify(self):
+    """Changes are found with inotify."""
+    self.assertWatches(watch.InotifyWatcher)
+
+
+  def testPolling(self):
+    """Changes are found by polling."""
+    pollSeconds = watch.POLL_SECONDS
+    watch.POLL_SECONDS = 0.05
+    try:
+      self.assertWatches(watch.PollingWatcher)
+    finally:
+      watch.POLL_SECONDS = pollSeconds
+
+
+  def testWatch(self):
+    """All the files are checked first, and then the ones that change."""
+    checked = []
+    started = threading.Event()
+
+    def check(paths):
+      """Records the paths checked."""
+      checked.append(paths)
+      started.set()
+
+    thread = threading.Thread(target=watch.watch, args=([self.directory], [], check, 1))
+    thread.start()
+    started.wait()
+    path = self.write('a.h', '@class A;\n\n')
+    thread.join()
+    self.assertEquals([sorted([path, os.path.join(self.directory, 'sub', 'b.m')]), [path]], checked)